@@ -1,39 +1,35 @@
 
+import time
+inicio_rerun = time.perf_counter()
 import streamlit as st
 from streamlit_drawable_canvas import st_canvas
 import uuid
-import io
-import math
 import json
 import hashlib
-import ezdxf
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.pdfgen import canvas as pdf_canvas
-from reportlab.lib.units import cm
+import os
 from datetime import datetime
-
-# ========================
-# Compatibilidade ezdxf
-# ========================
-try:
-    from ezdxf.enums import TextEntityAlignment as TEA
-except Exception:
-    TEA = None
-
+from armazem import ARMAZEM
+from arranjo import arranjar
+from desenho import (
+    clamp, comodos_to_drawing, ids_objetos, objetos_editados, patch_drawing, sync_comodos_from_canvas,
+)
+from exportadores import ESCALAS_PDF, NIVEL_ZIP, bibliotecas_carregadas
+from indice import GradeEspacial
+from quantitativos import PE_DIREITO_M, calcular_quantitativos, quantitativos_csv
+from historico import Historico
+from importador import importar_dxf
+from metricas import METRICAS, Metricas, medir
+from persistencia import CAMPOS_META, EXTENSAO, abrir_planta, planta_de_buffer, planta_de_json, planta_para_json, salvar_planta
+from sessao import CACHE_DERIVADOS, MemoriaSessao
+from tarefas import EXPORTACOES
+
+# Na primeira execução do processo isto inclui numpy e os módulos do app;
+# ezdxf e reportlab só são carregados pelos workers de exportação
+METRICAS.observar("imports", (time.perf_counter() - inicio_rerun) * 1000.0)
 
 # ========================
 # Funções Auxiliares
 # ========================
-def clamp(v, vmin, vmax):
-    return max(vmin, min(v, vmax))
-
-
-def snap(v, step):
-    if not step or step <= 0:
-        return v
-    return round(v / step) * step
-
-
 def get_hash(obj) -> str:
     """Hash estável para detectar mudanças reais"""
     return hashlib.md5(json.dumps(obj, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
@@ -45,389 +41,292 @@ def ensure_ids(comodos):
             c["id"] = f"c_{uuid.uuid4().hex[:8]}"
 
 
-def comodos_to_drawing(terreno_w_m, terreno_h_m, comodos, px_por_m):
-    """Converte cômodos para formato Fabric.js"""
-    objects = [{
-        "type": "rect",
-        "left": 0,
-        "top": 0,
-        "width": float(terreno_w_m * px_por_m),
-        "height": float(terreno_h_m * px_por_m),
-        "fill": "rgba(240,240,240,1)",
-        "stroke": "black",
-        "strokeWidth": 2,
-        "selectable": False,
-        "evented": False,
-        "objectCaching": False,
-    }]
+# ========================
+# Cache de exportação
+# ========================
+INTERVALO_PROGRESSO_S = 1.0  # de quanto em quanto tempo a barra de progresso é atualizada
+
+def chave_planta(terreno_w_m, terreno_h_m, revisao_id, esp_ext_m, esp_int_m, margem_m) -> str:
+    """Hash de tudo que influencia os arquivos exportados.
+
+    Os cômodos entram pelo id da revisão (ver historico.Historico), que já é
+    um hash do conteúdo: não é preciso serializar a planta a cada rerun.
+    """
+    return get_hash({
+        "terreno": [float(terreno_w_m), float(terreno_h_m)],
+        "paredes": [float(esp_ext_m), float(esp_int_m)],
+        "margem": float(margem_m),
+        "revisao": revisao_id,
+    })
+
+
+def chave_pdf(chave) -> str:
+    """O PDF imprime a data, então a chave também muda a cada dia"""
+    return f"{chave}:{datetime.now().strftime('%Y%m%d')}"
+
+
+def pedidos_exportacao(chave, escala_pdf, svgz, nivel_zip=None, blocos=False, r12=False):
+    """(rótulo, chave, formato, opções, nome do arquivo, mime) de cada download.
+
+    `opcoes` são pares (nome, valor) repassados ao gerador, ex.: (("escala", 100),).
+    Com `nivel_zip`, os três formatos saem num único pacote ZIP. O DXF é R2010;
+    com `blocos`, usa BLOCK/INSERT por tipo de cômodo e, com `r12`, sai no R12
+    em streaming (para plantas grandes).
+    """
+    if nivel_zip is not None:
+        opcoes = (("nivel", nivel_zip),)
+        if escala_pdf is not None:
+            opcoes += (("escala", escala_pdf),)
+        if blocos:
+            opcoes += (("blocos", True),)
+        elif r12:
+            opcoes += (("r12", True),)
+        return [("🗜️ Baixar pacote (ZIP)", chave_pdf(chave), "zip", opcoes, "planta.zip", "application/zip")]
+    if escala_pdf is None:
+        pdf = ("📄 Baixar PDF", chave_pdf(chave), "pdf", (), "planta.pdf", "application/pdf")
+    else:
+        pdf = ("📄 Baixar PDF", chave_pdf(chave), "pdf_folhas", (("escala", escala_pdf),), "planta.pdf", "application/pdf")
+    formato_svg = "svgz" if svgz else "svg"
+    formato_dxf = "dxf_blocos" if blocos else "dxf_r12" if r12 else "dxf"
+    return [
+        pdf,
+        ("🎨 Baixar SVG/CDR", chave, formato_svg, (), f"planta.{formato_svg}", "image/svg+xml"),
+        ("📐 Baixar DXF", chave, formato_dxf, (), "planta.dxf", "application/dxf"),
+    ]
 
-    for c in comodos:
-        top_px = (terreno_h_m - (c["y"] + c["comprimento"])) * px_por_m
-        objects.append({
-            "type": "rect",
-            "left": float(c["x"] * px_por_m),
-            "top": float(top_px),
-            "width": float(c["largura"] * px_por_m),
-            "height": float(c["comprimento"] * px_por_m),
-            "fill": "rgba(160,203,232,0.5)",
-            "stroke": "blue",
-            "strokeWidth": 2,
-            "objectCaching": False,
-        })
 
-    return {"version": "4.4.0", "objects": objects}
+@st.fragment(run_every=INTERVALO_PROGRESSO_S)
+def acompanhar_exportacao(itens):
+    """Só este trecho da página é refeito enquanto os arquivos são gerados em segundo plano"""
+    progresso = EXPORTACOES.progresso(itens)
+    st.progress(progresso, text=f"Gerando arquivos... {progresso:.0%}")
+    if progresso >= 1.0:
+        st.rerun()
 
 
-def sync_comodos_from_canvas(drawing, terreno_w_m, terreno_h_m, comodos, px_por_m, snap_m):
-    """Sincroniza comodos a partir do drawing do canvas"""
-    if not drawing or "objects" not in drawing:
-        return
+# ========================
+# Sobreposições
+# ========================
+ENCAIXE_TOL_M = 0.30  # distância máxima para encostar um bloco no vizinho
 
-    objs = drawing.get("objects", [])
-    if len(objs) <= 1:
-        return
 
-    terreno_w_px = float(terreno_w_m * px_por_m)
-    terreno_h_px = float(terreno_h_m * px_por_m)
-    snap_px = float(snap_m * px_por_m) if snap_m and snap_m > 0 else 0.0
+def descrever_sobreposicoes(indice, comodos):
+    """Lista legível dos pares de blocos sobrepostos"""
+    nomes = {c["id"]: c.get("nome", "Bloco") for c in comodos}
+    return [f"{nomes.get(a, a)} × {nomes.get(b, b)}" for a, b in indice.sobreposicoes()]
 
-    for i in range(1, len(objs)):
-        if (i - 1) >= len(comodos):
-            break
 
-        obj = objs[i]
-        if obj.get("type") != "rect":
-            continue
+# ========================
+# Janela de visualização (viewport)
+# ========================
+MAX_CANVAS_PX = 1600  # maior lado do canvas enviado ao navegador
+ZOOMS = [0.25, 0.5, 1.0, 2.0, 4.0]
 
-        sx = float(obj.get("scaleX", 1.0) or 1.0)
-        sy = float(obj.get("scaleY", 1.0) or 1.0)
-        w_px = float(obj.get("width", 0.0) or 0.0) * sx
-        h_px = float(obj.get("height", 0.0) or 0.0) * sy
-        left_px = float(obj.get("left", 0.0) or 0.0)
-        top_px = float(obj.get("top", 0.0) or 0.0)
 
-        if snap_px > 0:
-            left_px = snap(left_px, snap_px)
-            top_px = snap(top_px, snap_px)
-            w_px = max(1.0, snap(w_px, snap_px))
-            h_px = max(1.0, snap(h_px, snap_px))
+def escala_efetiva():
+    """px por metro no canvas: escala configurada × zoom"""
+    return float(st.session_state["px_por_m"]) * float(st.session_state["zoom"])
 
-        max_left = max(0.0, terreno_w_px - w_px)
-        max_top = max(0.0, terreno_h_px - h_px)
-        left_px = clamp(left_px, 0.0, max_left)
-        top_px = clamp(top_px, 0.0, max_top)
 
-        w_m = w_px / px_por_m
-        h_m = h_px / px_por_m
-        x_m = left_px / px_por_m
-        y_m = terreno_h_m - (top_px / px_por_m) - h_m
+def tamanho_canvas():
+    ppm = escala_efetiva()
+    total_w = int(float(st.session_state["terreno_w_m"]) * ppm)
+    total_h = int(float(st.session_state["terreno_h_m"]) * ppm)
+    return min(total_w, MAX_CANVAS_PX), min(total_h, MAX_CANVAS_PX), total_w, total_h
 
-        x_m = clamp(x_m, 0.0, max(0.0, terreno_w_m - w_m))
-        y_m = clamp(y_m, 0.0, max(0.0, terreno_h_m - h_m))
 
-        comodos[i - 1]["x"] = float(x_m)
-        comodos[i - 1]["y"] = float(y_m)
-        comodos[i - 1]["largura"] = float(max(0.10, w_m))
-        comodos[i - 1]["comprimento"] = float(max(0.10, h_m))
+def viewport_atual():
+    """Janela visível ({"ox", "oy", "w", "h"} em pixels); None se o terreno inteiro cabe no canvas"""
+    w, h, total_w, total_h = tamanho_canvas()
+    if w >= total_w and h >= total_h:
+        return None
+    ppm = escala_efetiva()
+    terreno_w_m = float(st.session_state["terreno_w_m"])
+    terreno_h_m = float(st.session_state["terreno_h_m"])
+    vx = clamp(float(st.session_state["janela_x_m"]), 0.0, max(0.0, terreno_w_m - w / ppm))
+    vy = clamp(float(st.session_state["janela_y_m"]), 0.0, max(0.0, terreno_h_m - h / ppm))
+    return {"ox": vx * ppm, "oy": (terreno_h_m - vy - h / ppm) * ppm, "w": w, "h": h}
+
+
+def mover_janela(dx_frac, dy_frac):
+    """Desloca a janela em frações do seu tamanho (y para cima) e refaz o desenho"""
+    w, h, _, _ = tamanho_canvas()
+    ppm = escala_efetiva()
+    terreno_w_m = float(st.session_state["terreno_w_m"])
+    terreno_h_m = float(st.session_state["terreno_h_m"])
+    st.session_state["janela_x_m"] = clamp(
+        float(st.session_state["janela_x_m"]) + dx_frac * w / ppm, 0.0, max(0.0, terreno_w_m - w / ppm))
+    st.session_state["janela_y_m"] = clamp(
+        float(st.session_state["janela_y_m"]) + dy_frac * h / ppm, 0.0, max(0.0, terreno_h_m - h / ppm))
+    descartar_desenho()
 
 
 # ========================
-# DXF com Paredes Duplas (CORRIGIDO COM TextIOWrapper)
+# Tempos por etapa
 # ========================
-def gerar_dxf_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50):
-    """Gera DXF com paredes duplas e margem"""
-    doc = ezdxf.new("R2010")
-    msp = doc.modelspace()
-
-    if "PAREDES" not in doc.layers:
-        doc.layers.new(name="PAREDES", dxfattribs={"color": 7})
-    if "TEXTOS" not in doc.layers:
-        doc.layers.new(name="TEXTOS", dxfattribs={"color": 2})
-    if "MARGEM" not in doc.layers:
-        doc.layers.new(name="MARGEM", dxfattribs={"color": 1})
-
-    def q(v, nd=4):
-        return round(float(v), nd)
-
-    def seg_key(p1, p2):
-        x1, y1 = q(p1[0]), q(p1[1])
-        x2, y2 = q(p2[0]), q(p2[1])
-        if (x2, y2) < (x1, y1):
-            x1, y1, x2, y2 = x2, y2, x1, y1
-        return (x1, y1, x2, y2)
-
-    segs = {}
-    textos = []
+METRICAS_DIR = os.environ.get("AUTOPLANTAS_METRICAS_DIR", "metricas")
 
-    for c in comodos:
-        x, y = float(c["x"]), float(c["y"])
-        w, h = float(c["largura"]), float(c["comprimento"])
-        nome = c.get("nome", "Bloco")
-
-        pA = (x, y)
-        pB = (x + w, y)
-        pC = (x + w, y + h)
-        pD = (x, y + h)
-
-        for p1, p2 in [(pA, pB), (pB, pC), (pC, pD), (pD, pA)]:
-            k = seg_key(p1, p2)
-            if k not in segs:
-                segs[k] = {"p1": (k[0], k[1]), "p2": (k[2], k[3]), "count": 1}
-            else:
-                segs[k]["count"] += 1
-
-        textos.append((nome, x + w / 2, y + h / 2))
-
-    def draw_double_wall(p1, p2, thickness):
-        off = float(thickness) / 2.0
-        x1, y1 = p1
-        x2, y2 = p2
-
-        if math.isclose(y1, y2, abs_tol=1e-9):
-            y = y1
-            msp.add_line((x1, y + off), (x2, y + off), dxfattribs={"layer": "PAREDES"})
-            msp.add_line((x1, y - off), (x2, y - off), dxfattribs={"layer": "PAREDES"})
-            return
-
-        if math.isclose(x1, x2, abs_tol=1e-9):
-            x = x1
-            msp.add_line((x + off, y1), (x + off, y2), dxfattribs={"layer": "PAREDES"})
-            msp.add_line((x - off, y1), (x - off, y2), dxfattribs={"layer": "PAREDES"})
-            return
-
-        msp.add_line((x1, y1), (x2, y2), dxfattribs={"layer": "PAREDES"})
-
-    # Desenhar margem (retângulo externo)
-    msp.add_lwpolyline(
-        [(-margem_m, -margem_m), (larg_m + margem_m, -margem_m), 
-         (larg_m + margem_m, comp_m + margem_m), (-margem_m, comp_m + margem_m), (-margem_m, -margem_m)],
-        dxfattribs={"layer": "MARGEM", "color": 1}
-    )
 
-    for item in segs.values():
-        thickness = esp_ext_m if item["count"] == 1 else esp_int_m
-        draw_double_wall(item["p1"], item["p2"], thickness)
+def metricas_sessao():
+    """Histogramas desta sessão (os do processo ficam em metricas.METRICAS)"""
+    return st.session_state["metricas"]
 
-    for nome, cx, cy in textos:
-        txt = msp.add_text(nome, dxfattribs={"layer": "TEXTOS", "height": 0.30})
-        if TEA is not None:
-            txt.set_placement((cx, cy), align=TEA.MIDDLE_CENTER)
-        else:
-            try:
-                txt.set_pos((cx, cy), align="MIDDLE_CENTER")
-            except Exception:
-                txt.dxf.insert = (cx, cy)
-
-    # CORRIGIDO: usar TextIOWrapper para converter strings em bytes
-    buff_bytes = io.BytesIO()
-    buff_text = io.TextIOWrapper(buff_bytes, encoding='utf-8')
-    doc.write(buff_text)
-    buff_text.flush()
-    buff_bytes.seek(0)
-    return buff_bytes.getvalue()
-
-    # CORRIGIDO: usar TextIOWrapper para converter strings em bytes
-    buff_bytes = io.BytesIO()
-    buff_text = io.TextIOWrapper(buff_bytes, encoding='utf-8')
-    doc.write(buff_text)
-    buff_text.flush()
-    buff_bytes.seek(0)
-    return buff_bytes.getvalue()
+
+def tabela_metricas(registro):
+    return [{"etapa": etapa, **{k: round(v, 2) for k, v in r.items()}} for etapa, r in registro.resumo().items()]
 
 
 # ========================
-# PDF com ReportLab
+# Memória da sessão
 # ========================
-def gerar_pdf_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50):
-    """Gera PDF com planta baixa em A4 paisagem com margem"""
-    buffer = io.BytesIO()
-    page_width, page_height = landscape(A4)
-    c = pdf_canvas.Canvas(buffer, pagesize=landscape(A4))
-    
-    margin = 1 * cm
-    disponivel_w = page_width - 2 * margin
-    disponivel_h = page_height - 3 * cm
-    
-    # Escala para caber na página (incluindo margem)
-    escala_w = disponivel_w / (larg_m + 2 * margem_m)
-    escala_h = disponivel_h / (comp_m + 2 * margem_m)
-    escala = min(escala_w, escala_h)
-    
-    # Posição inicial (com margem)
-    total_w = (larg_m + 2 * margem_m) * escala
-    total_h = (comp_m + 2 * margem_m) * escala
-    x_inicio = margin + (disponivel_w - total_w) / 2 + margem_m * escala
-    y_inicio = margin + (disponivel_h - total_h) / 2 + margem_m * escala
-    
-    # Título
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(margin, page_height - 1 * cm, "PLANTA BAIXA")
-    
-    # Data e escala
-    c.setFont("Helvetica", 10)
-    data_str = datetime.now().strftime("%d/%m/%Y")
-    c.drawString(margin, page_height - 1.5 * cm, f"Data: {data_str}")
-    c.drawString(margin + 8 * cm, page_height - 1.5 * cm, f"Escala: 1:{int(1/escala*100)}")
-    
-    # Função auxiliar para desenhar parede dupla
-    def desenhar_parede_dupla(p1, p2, thickness):
-        off = thickness * escala / 2.0
-        x1, y1 = p1
-        x2, y2 = p2
-        
-        x1_px = x_inicio + x1 * escala
-        y1_px = y_inicio + y1 * escala
-        x2_px = x_inicio + x2 * escala
-        y2_px = y_inicio + y2 * escala
-        
-        if math.isclose(y1, y2, abs_tol=1e-9):
-            y = y1_px
-            c.line(x1_px, y + off, x2_px, y + off)
-            c.line(x1_px, y - off, x2_px, y - off)
-        elif math.isclose(x1, x2, abs_tol=1e-9):
-            x = x1_px
-            c.line(x + off, y1_px, x + off, y2_px)
-            c.line(x - off, y1_px, x - off, y2_px)
-    
-    # Coletar segmentos
-    def q(v, nd=4):
-        return round(float(v), nd)
-    
-    def seg_key(p1, p2):
-        x1, y1 = q(p1[0]), q(p1[1])
-        x2, y2 = q(p2[0]), q(p2[1])
-        if (x2, y2) < (x1, y1):
-            x1, y1, x2, y2 = x2, y2, x1, y1
-        return (x1, y1, x2, y2)
-    
-    segs = {}
-    textos = []
-    
-    for com in comodos:
-        x, y = float(com["x"]), float(com["y"])
-        w, h = float(com["largura"]), float(com["comprimento"])
-        nome = com.get("nome", "Bloco")
-        
-        pA = (x, y)
-        pB = (x + w, y)
-        pC = (x + w, y + h)
-        pD = (x, y + h)
-        
-        for p1, p2 in [(pA, pB), (pB, pC), (pC, pD), (pD, pA)]:
-            k = seg_key(p1, p2)
-            if k not in segs:
-                segs[k] = {"p1": (k[0], k[1]), "p2": (k[2], k[3]), "count": 1}
-            else:
-                segs[k]["count"] += 1
-        
-        textos.append((nome, x + w / 2, y + h / 2))
-    
-    # Desenhar margem
-    c.setLineWidth(1.0)
-    margem_x1 = x_inicio - margem_m * escala
-    margem_y1 = y_inicio - margem_m * escala
-    margem_x2 = x_inicio + larg_m * escala
-    margem_y2 = y_inicio + comp_m * escala
-    c.rect(margem_x1, margem_y1, margem_x2 - margem_x1, margem_y2 - margem_y1, stroke=1, fill=0)
-    
-    # Desenhar paredes
-    c.setLineWidth(0.5)
-    for item in segs.values():
-        thickness = esp_ext_m if item["count"] == 1 else esp_int_m
-        desenhar_parede_dupla(item["p1"], item["p2"], thickness)
-    
-    # Desenhar textos
-    c.setFont("Helvetica", 8)
-    for nome, cx, cy in textos:
-        cx_px = x_inicio + cx * escala
-        cy_px = y_inicio + cy * escala
-        c.drawCentredString(cx_px, cy_px, nome)
-    
-    c.save()
-    buffer.seek(0)
-    return buffer.getvalue()
+def memoria():
+    return MemoriaSessao(st.session_state["sessao_id"], st.session_state)
+
+
+def aguardar_eco():
+    """O app mudou a planta por conta própria: o próximo drawing é uma versão nova.
+
+    A versão vai no drawing para o canvas sempre recarregá-lo (e devolver o
+    eco), mesmo que a geometria seja igual à do último drawing enviado; até o
+    eco chegar, o valor do canvas é o da planta anterior (ver objetos_editados).
+    """
+    st.session_state["canvas_versao"] += 1
+    st.session_state["canvas_aguardando"] = True
+    return st.session_state["canvas_versao"]
+
+
+def construir_desenho():
+    with medir("comodos_to_drawing", metricas_sessao()):
+        drawing = comodos_to_drawing(
+            float(st.session_state["terreno_w_m"]),
+            float(st.session_state["terreno_h_m"]),
+            st.session_state["comodos"],
+            escala_efetiva(),
+            viewport_atual(),
+        )
+    drawing["versao"] = st.session_state["canvas_versao"]
+    return drawing
+
+
+def obter_desenho():
+    """Drawing da sessão; se foi despejado do cache compartilhado, é refeito a partir dos cômodos"""
+    return memoria().obter("drawing", construir_desenho)
+
+
+def registrar_revisao(alterados=None):
+    """Registra o estado atual dos cômodos no histórico (no-op se nada mudou).
+
+    `alterados` (ids) limita a comparação aos blocos que podem ter mudado.
+    """
+    return st.session_state["historico"].registrar(st.session_state["comodos"], alterados)
+
+
+def indexar_comodos(comodos):
+    """Refaz a grade espacial e o mapa id -> cômodo usado pelo sync para uma lista de cômodos"""
+    st.session_state["indice"].reconstruir(comodos)
+    st.session_state["por_id"] = {c["id"]: c for c in comodos}
+
+
+def restaurar_revisao(comodos):
+    """Troca os cômodos pelos de uma revisão do histórico (desfazer/refazer).
+
+    O valor velho do canvas não é sincronizado até chegar o eco do drawing
+    novo (ver aguardar_eco), então nenhuma revisão apaga o refazer (ver
+    tests/test_desenho.py).
+    """
+    st.session_state["comodos"] = comodos
+    indexar_comodos(comodos)
+    atualizar_desenho()
+
+
+def descartar_desenho():
+    memoria().descartar("drawing")
+    aguardar_eco()
+
+
+def quantitativos_atuais(pe_direito_m):
+    """Quantitativos da revisão atual; plantas iguais (em qualquer sessão) reaproveitam o cálculo"""
+    esp_ext_m = float(st.session_state["esp_ext_m"])
+    esp_int_m = float(st.session_state["esp_int_m"])
+    chave = f"quantitativos:{st.session_state['historico'].atual.id}:{esp_ext_m}:{esp_int_m}:{pe_direito_m}"
+    quant = CACHE_DERIVADOS.get(chave)
+    if quant is None:
+        with medir("quantitativos", metricas_sessao()):
+            quant = calcular_quantitativos(st.session_state["comodos"], esp_ext_m, esp_int_m, pe_direito_m)
+        CACHE_DERIVADOS.put(chave, quant)
+    return quant
+
+
+def organizar_comodos(girar=False):
+    """Empacota todos os cômodos no terreno e aplica o resultado de uma vez.
+
+    O drawing recebe um único patch com as novas posições. Retorna os
+    cômodos que não couberam (ficam onde estavam).
+    """
+    comodos = st.session_state["comodos"]
+    with medir("arranjo", metricas_sessao()):
+        posicoes, sobra = arranjar(
+            comodos,
+            float(st.session_state["terreno_w_m"]),
+            float(st.session_state["terreno_h_m"]),
+            snap_m=float(st.session_state["snap_m"]),
+            esp_ext_m=float(st.session_state["esp_ext_m"]),
+            girar=girar,
+        )
+    for c in comodos:
+        if c["id"] in posicoes:
+            c["x"], c["y"], c["largura"], c["comprimento"] = posicoes[c["id"]]
+    st.session_state["indice"].reconstruir(comodos)  # os dicts são os mesmos: por_id continua valendo
+    registrar_revisao()
+    atualizar_desenho()
+    faltaram = set(sobra)
+    return [c for c in comodos if c["id"] in faltaram]
+
 
 # ========================
-# SVG/CDR com paredes duplas
+# Plantas salvas
 # ========================
-def gerar_svg_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50):
-    """Gera SVG compatível com CorelDRAW com margem"""
-    escala = 100  # 1m = 100 unidades SVG
-    
-    svg_lines = [
-        f'<svg width="{(larg_m + 2 * margem_m) * escala}" height="{(comp_m + 2 * margem_m) * escala}" xmlns="http://www.w3.org/2000/svg">',
-        '<defs><style>text { font-family: Arial; font-size: 12px; }</style></defs>',
-    ]
-    
-    # Função auxiliar
-    def q(v, nd=4):
-        return round(float(v), nd)
-    
-    def seg_key(p1, p2):
-        x1, y1 = q(p1[0]), q(p1[1])
-        x2, y2 = q(p2[0]), q(p2[1])
-        if (x2, y2) < (x1, y1):
-            x1, y1, x2, y2 = x2, y2, x1, y1
-        return (x1, y1, x2, y2)
-    
-    segs = {}
-    textos = []
-    
-    for com in comodos:
-        x, y = float(com["x"]), float(com["y"])
-        w, h = float(com["largura"]), float(com["comprimento"])
-        nome = com.get("nome", "Bloco")
-        
-        pA = (x, y)
-        pB = (x + w, y)
-        pC = (x + w, y + h)
-        pD = (x, y + h)
-        
-        for p1, p2 in [(pA, pB), (pB, pC), (pC, pD), (pD, pA)]:
-            k = seg_key(p1, p2)
-            if k not in segs:
-                segs[k] = {"p1": (k[0], k[1]), "p2": (k[2], k[3]), "count": 1}
-            else:
-                segs[k]["count"] += 1
-        
-        textos.append((nome, x + w / 2, y + h / 2))
-    
-    # Desenhar margem
-    margem_x1 = margem_m * escala
-    margem_y1 = margem_m * escala
-    margem_x2 = (larg_m + margem_m) * escala
-    margem_y2 = (comp_m + margem_m) * escala
-    svg_lines.append(f'<rect x="{margem_x1}" y="{margem_y1}" width="{margem_x2 - margem_x1}" height="{margem_y2 - margem_y1}" stroke="black" stroke-width="2" fill="none"/>')
-    
-    # Desenhar paredes
-    for item in segs.values():
-        thickness = esp_ext_m if item["count"] == 1 else esp_int_m
-        off = thickness * escala / 2.0
-        x1, y1 = item["p1"]
-        x2, y2 = item["p2"]
-        
-        x1_px = (x1 + margem_m) * escala
-        y1_px = (y1 + margem_m) * escala
-        x2_px = (x2 + margem_m) * escala
-        y2_px = (y2 + margem_m) * escala
-        
-        if math.isclose(y1, y2, abs_tol=1e-9):
-            y = y1_px
-            svg_lines.append(f'<line x1="{x1_px}" y1="{y + off}" x2="{x2_px}" y2="{y + off}" stroke="black" stroke-width="1"/>')
-            svg_lines.append(f'<line x1="{x1_px}" y1="{y - off}" x2="{x2_px}" y2="{y - off}" stroke="black" stroke-width="1"/>')
-        elif math.isclose(x1, x2, abs_tol=1e-9):
-            x = x1_px
-            svg_lines.append(f'<line x1="{x + off}" y1="{y1_px}" x2="{x + off}" y2="{y2_px}" stroke="black" stroke-width="1"/>')
-            svg_lines.append(f'<line x1="{x - off}" y1="{y1_px}" x2="{x - off}" y2="{y2_px}" stroke="black" stroke-width="1"/>')
-    
-    # Desenhar textos
-    for nome, cx, cy in textos:
-        cx_px = (cx + margem_m) * escala
-        cy_px = (cy + margem_m) * escala
-        svg_lines.append(f'<text x="{cx_px}" y="{cy_px}" text-anchor="middle" dominant-baseline="middle">{nome}</text>')
-    
-    svg_lines.append('</svg>')
-    return '\n'.join(svg_lines)
+PLANTAS_DIR = os.environ.get("AUTOPLANTAS_PLANTAS_DIR", "plantas")
+
+
+def meta_planta():
+    return {k: float(st.session_state[k]) for k in CAMPOS_META}
+
+
+def plantas_salvas():
+    if not os.path.isdir(PLANTAS_DIR):
+        return []
+    return sorted(f[: -len(EXTENSAO)] for f in os.listdir(PLANTAS_DIR) if f.endswith(EXTENSAO))
+
+
+def carregar_planta(comodos, meta):
+    """Troca a planta da sessão (cômodos e parâmetros) pela lida de um arquivo"""
+    for k, v in meta.items():
+        st.session_state[k] = float(v)
+    ensure_ids(comodos)
+    st.session_state["comodos"] = comodos
+    indexar_comodos(comodos)
+    registrar_revisao()
+    descartar_desenho()
+
+
+def atualizar_desenho():
+    """Ajusta o drawing da sessão aos cômodos atuais sem recriá-lo"""
+    versao = aguardar_eco()
+    mem = memoria()
+    drawing = mem.espiar("drawing")
+    if drawing is not None:
+        with medir("patch_drawing", metricas_sessao()):
+            patch_drawing(
+                drawing,
+                float(st.session_state["terreno_h_m"]),
+                st.session_state["comodos"],
+                escala_efetiva(),
+                viewport_atual(),
+            )
+        drawing["versao"] = versao
+        mem.guardar("drawing", drawing)
+
 
 # ========================
 # App Principal
@@ -459,10 +358,31 @@ if "esp_int_m" not in st.session_state:
 if "margem_m" not in st.session_state:
     st.session_state["margem_m"] = 0.50
     st.session_state["margem_m"] = 0.50
-if "drawing" not in st.session_state:
-    st.session_state["drawing"] = None
-if "last_canvas_hash" not in st.session_state:
-    st.session_state["last_canvas_hash"] = None
+if "zoom" not in st.session_state:
+    st.session_state["zoom"] = 1.0
+if "janela_x_m" not in st.session_state:
+    st.session_state["janela_x_m"] = 0.0
+if "janela_y_m" not in st.session_state:
+    st.session_state["janela_y_m"] = float(st.session_state["terreno_h_m"])
+if "sessao_id" not in st.session_state:
+    st.session_state["sessao_id"] = uuid.uuid4().hex
+if "canvas_fps" not in st.session_state:
+    st.session_state["canvas_fps"] = {}
+if "canvas_versao" not in st.session_state:
+    st.session_state["canvas_versao"] = 0
+    # O primeiro valor do canvas é o eco do drawing inicial: não há o que sincronizar
+    st.session_state["canvas_aguardando"] = True
+if "export_chave" not in st.session_state:
+    st.session_state["export_chave"] = None
+if "encaixe_vizinhos" not in st.session_state:
+    st.session_state["encaixe_vizinhos"] = True
+if "indice" not in st.session_state or "por_id" not in st.session_state:
+    st.session_state["indice"] = GradeEspacial()
+    indexar_comodos(st.session_state["comodos"])
+if "historico" not in st.session_state:
+    st.session_state["historico"] = Historico(st.session_state["comodos"])
+if "metricas" not in st.session_state:
+    st.session_state["metricas"] = Metricas()
 col_left, col_right = st.columns([1, 2], gap="large")
 
 with col_left:
@@ -476,6 +396,7 @@ with col_left:
         esp_ext_new = st.number_input("Parede externa (m)", 0.08, 0.60, float(st.session_state["esp_ext_m"]), step=0.01)
         esp_int_new = st.number_input("Parede interna (m)", 0.05, 0.40, float(st.session_state["esp_int_m"]), step=0.01)
         margem_new = st.number_input("Margem da planta (m)", 0.0, 2.0, float(st.session_state["margem_m"]), step=0.10)
+        encaixe_new = st.checkbox("Encaixar nos blocos vizinhos", bool(st.session_state["encaixe_vizinhos"]))
         aplicar = st.form_submit_button("✅ Aplicar")
 
     if aplicar:
@@ -485,10 +406,9 @@ with col_left:
         st.session_state["snap_m"] = float(snap_new)
         st.session_state["esp_ext_m"] = float(esp_ext_new)
         st.session_state["esp_int_m"] = float(esp_int_new)
-        
-        if "margem_m" not in st.session_state:
-    st.session_state["margem_m"] = 0.50
-        st.session_state["drawing"] = None
+        st.session_state["margem_m"] = float(margem_new)
+        st.session_state["encaixe_vizinhos"] = bool(encaixe_new)
+        descartar_desenho()
         st.rerun()
 
     st.divider()
@@ -501,101 +421,216 @@ with col_left:
 
     b1, b2 = st.columns(2)
     if b1.button("Adicionar", use_container_width=True):
-        st.session_state["comodos"].append({
+        novo = {
             "id": f"c_{uuid.uuid4().hex[:8]}",
             "nome": nome,
             "x": 0.0,
             "y": 0.0,
             "largura": float(w_m),
             "comprimento": float(h_m),
-        })
-        st.session_state["drawing"] = None
+        }
+        st.session_state["comodos"].append(novo)
+        st.session_state["por_id"][novo["id"]] = novo
+        st.session_state["indice"].atualizar(novo["id"], novo["x"], novo["y"], novo["largura"], novo["comprimento"])
+        registrar_revisao()
+        atualizar_desenho()
         st.rerun()
 
     if b2.button("Limpar tudo", use_container_width=True):
         st.session_state["comodos"] = []
-        st.session_state["drawing"] = None
+        indexar_comodos([])
+        registrar_revisao()
+        atualizar_desenho()
         st.rerun()
 
-    st.divider()
-    if st.button("🔄 Recriar desenho", use_container_width=True):
-        st.session_state["drawing"] = None
+    girar = st.checkbox("Permitir girar blocos ao organizar", key="arranjo_girar")
+    if st.button("🧩 Organizar automaticamente", use_container_width=True, disabled=not st.session_state["comodos"]):
+        sobra = organizar_comodos(girar)
+        if sobra:
+            st.session_state["aviso_arranjo"] = f"{len(sobra)} bloco(s) não couberam no terreno e ficaram onde estavam."
         st.rerun()
+    if "aviso_arranjo" in st.session_state:
+        st.warning(st.session_state.pop("aviso_arranjo"))
 
-    st.divider()
-    st.header("📥 Exportar")
-
-    # Gerar arquivos
-       # Gerar arquivos
-    dxf_data = gerar_dxf_paredes_duplas(
-        st.session_state["terreno_w_m"],
-        st.session_state["terreno_h_m"],
-        st.session_state["comodos"],
-        esp_ext_m=st.session_state["esp_ext_m"],
-        esp_int_m=st.session_state["esp_int_m"],
-        margem_m=st.session_state["margem_m"],
-    )
-    
-    pdf_data = gerar_pdf_paredes_duplas(
-        st.session_state["terreno_w_m"],
-        st.session_state["terreno_h_m"],
-        st.session_state["comodos"],
-        esp_ext_m=st.session_state["esp_ext_m"],
-        esp_int_m=st.session_state["esp_int_m"],
-        margem_m=st.session_state["margem_m"],
-    )
-    
-    svg_data = gerar_svg_paredes_duplas(
-        st.session_state["terreno_w_m"],
-        st.session_state["terreno_h_m"],
-        st.session_state["comodos"],
-        esp_ext_m=st.session_state["esp_ext_m"],
-        esp_int_m=st.session_state["esp_int_m"],
-        margem_m=st.session_state["margem_m"],
-    )
+    historico = st.session_state["historico"]
+    b3, b4 = st.columns(2)
+    if b3.button("↩️ Desfazer", use_container_width=True, disabled=not historico.pode_desfazer()):
+        restaurar_revisao(historico.desfazer())
+        st.rerun()
+    if b4.button("↪️ Refazer", use_container_width=True, disabled=not historico.pode_refazer()):
+        restaurar_revisao(historico.refazer())
+        st.rerun()
 
-    col_exp1, col_exp2, col_exp3 = st.columns(3)
-    
-    with col_exp1:
+    st.divider()
+    st.header("💾 Plantas")
+
+    nome_arquivo = st.text_input("Nome", "planta", key="arquivo_nome").strip()
+    if st.button("Salvar", use_container_width=True, disabled=not nome_arquivo):
+        os.makedirs(PLANTAS_DIR, exist_ok=True)
+        caminho = os.path.join(PLANTAS_DIR, os.path.basename(nome_arquivo) + EXTENSAO)
+        salvar_planta(caminho, st.session_state["comodos"], **meta_planta())
+        st.success(f"Planta salva em {caminho}")
+
+    salvas = plantas_salvas()
+    if salvas:
+        escolhida = st.selectbox("Plantas salvas", salvas, key="arquivo_escolhido")
+        if st.button("Abrir", use_container_width=True):
+            try:
+                planta, meta = abrir_planta(os.path.join(PLANTAS_DIR, escolhida + EXTENSAO))
+                comodos = planta.to_comodos()
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                st.error(f"Não foi possível abrir {escolhida}: {e}")
+            else:
+                carregar_planta(comodos, meta)
+                st.rerun()
+
+    enviado = st.file_uploader("Importar (.json, .aplt ou .dxf)", type=["json", EXTENSAO[1:], "dxf"], key="arquivo_importar")
+    if enviado is not None and st.button("Importar", use_container_width=True):
+        avisos = []
+        try:
+            if enviado.name.endswith(EXTENSAO):
+                planta, meta = planta_de_buffer(enviado.getvalue())
+                comodos = planta.to_comodos()
+            elif enviado.name.lower().endswith(".dxf"):
+                enviado.seek(0)
+                comodos, meta, avisos = importar_dxf(enviado)
+            else:
+                comodos, meta = planta_de_json(enviado.getvalue().decode("utf-8"))
+        except (ValueError, KeyError, TypeError) as e:
+            st.error(f"Arquivo inválido: {e}")
+        else:
+            if not comodos:
+                st.error("Nenhum cômodo encontrado no arquivo.")
+            else:
+                if avisos:
+                    extra = f" (e mais {len(avisos) - 5})" if len(avisos) > 5 else ""
+                    st.session_state["aviso_importacao"] = " ".join(avisos[:5]) + extra
+                carregar_planta(comodos, meta)
+                st.rerun()
+    if "aviso_importacao" in st.session_state:
+        st.warning(st.session_state.pop("aviso_importacao"))
+
+    # O JSON só é montado quando pedido: numa planta grande ele custa caro a cada rerun
+    if st.checkbox("Exportar JSON", key="arquivo_json"):
         st.download_button(
-            "📄 Baixar PDF",
-            data=pdf_data,
-            file_name="planta.pdf",
-            mime="application/pdf",
+            "⬇️ Baixar JSON",
+            data=planta_para_json(st.session_state["comodos"], **meta_planta()),
+            file_name=f"{nome_arquivo or 'planta'}.json",
+            mime="application/json",
             use_container_width=True,
         )
 
-    with col_exp2:
-        st.download_button(
-            "🎨 Baixar SVG/CDR",
-            data=svg_data,
-            file_name="planta.svg",
-            mime="image/svg+xml",
-            use_container_width=True,
+    st.divider()
+    if st.button("🔄 Recriar desenho", use_container_width=True):
+        descartar_desenho()
+        st.rerun()
+
+    st.divider()
+    st.header("📥 Exportar")
+
+    with medir("get_hash", metricas_sessao()):
+        chave = chave_planta(
+            st.session_state["terreno_w_m"],
+            st.session_state["terreno_h_m"],
+            historico.atual.id,
+            st.session_state["esp_ext_m"],
+            st.session_state["esp_int_m"],
+            st.session_state["margem_m"],
         )
 
-    with col_exp3:
-        st.download_button(
-            "📐 Baixar DXF",
-            data=dxf_data,
-            file_name="planta.dxf",
-            mime="application/dxf",
-            use_container_width=True,
+    # Arquivos só são gerados quando o usuário pede (e reaproveitados do cache)
+    escala_pdf = st.selectbox(
+        "Escala do PDF",
+        [None] + ESCALAS_PDF,
+        format_func=lambda n: "Ajustar a uma folha" if n is None else f"1:{n} (várias folhas)",
+        key="exportar_escala_pdf",
+    )
+    blocos_dxf = st.checkbox("DXF com blocos por tipo de cômodo (BLOCK/INSERT)", key="exportar_blocos",
+                             help="Cada tipo e tamanho repetido vira um bloco com o rótulo (cômodos únicos ficam como texto). "
+                                  "Cômodos que não encostam em nenhum outro levam as próprias paredes no "
+                                  "bloco; paredes compartilhadas continuam como linhas. Só compensa quando "
+                                  "há muitos cômodos iguais")
+    r12_dxf = st.checkbox("DXF R12 em streaming (plantas grandes)", key="exportar_r12", disabled=blocos_dxf,
+                          help="Escreve o DXF direto, sem montar o documento: mais rápido e com menos memória, "
+                               "mas no formato antigo R12 (AC1009, textos em cp1252)") and not blocos_dxf
+    pacote = st.checkbox("Tudo num único ZIP (DXF + PDF + SVG)", key="exportar_zip")
+    if pacote:
+        nivel_zip = st.select_slider("Compressão do ZIP", list(range(10)), value=NIVEL_ZIP, key="exportar_nivel_zip",
+                                     help="0 = sem compressão; 9 = arquivo menor, geração mais lenta")
+        svgz = False
+    else:
+        nivel_zip = None
+        svgz = st.checkbox("SVG compactado (.svgz)", key="exportar_svgz")
+
+    preparar = st.button("⚙️ Preparar arquivos", use_container_width=True)
+    if preparar:
+        st.session_state["export_chave"] = chave
+
+    if st.session_state["export_chave"] == chave:
+        parametros = (
+            st.session_state["terreno_w_m"],
+            st.session_state["terreno_h_m"],
+            st.session_state["comodos"],
+            st.session_state["esp_ext_m"],
+            st.session_state["esp_int_m"],
+            st.session_state["margem_m"],
         )
+        # Pedidos repetidos caem no mesmo job (ou no arquivo já pronto)
+        pedidos = pedidos_exportacao(chave, escala_pdf, svgz, nivel_zip, blocos_dxf, r12_dxf)
+        itens = [
+            EXPORTACOES.submeter(chave_item, formato, *parametros, opcoes=opcoes, repetir_falha=preparar,
+                                 metricas=metricas_sessao())
+            for _, chave_item, formato, opcoes, _, _ in pedidos
+        ]
+
+        if EXPORTACOES.progresso(itens) < 1.0:
+            acompanhar_exportacao(itens)
+        else:
+            for coluna, (rotulo, _, formato, _, arquivo, mime), item in zip(st.columns(len(pedidos)), pedidos, itens):
+                with coluna:
+                    try:
+                        dados = EXPORTACOES.resultado(item)
+                    except Exception as e:
+                        st.error(f"Falha ao gerar {formato.upper()}: {e}")
+                        continue
+                    if dados is None:
+                        st.caption("Arquivo expirou; clique em **Preparar arquivos** de novo.")
+                        continue
+                    st.download_button(
+                        rotulo,
+                        data=dados,
+                        file_name=arquivo,
+                        mime=mime,
+                        use_container_width=True,
+                    )
+    else:
+        st.caption("Clique em **Preparar arquivos** para gerar PDF, SVG e DXF da planta atual.")
 
 with col_right:
     st.subheader("🎨 Editor (arrastar / redimensionar)")
 
     terreno_w_m = float(st.session_state["terreno_w_m"])
     terreno_h_m = float(st.session_state["terreno_h_m"])
-    px_por_m = int(st.session_state["px_por_m"])
     snap_m = float(st.session_state["snap_m"])
 
-    canvas_w = int(terreno_w_m * px_por_m)
-    canvas_h = int(terreno_h_m * px_por_m)
+    nav = st.columns([2, 1, 1, 1, 1])
+    zoom = nav[0].select_slider("Zoom", ZOOMS, value=float(st.session_state["zoom"]), format_func=lambda z: f"{z:g}×")
+    if zoom != st.session_state["zoom"]:
+        st.session_state["zoom"] = zoom
+        descartar_desenho()
+        st.rerun()
+
+    viewport = viewport_atual()
+    if viewport is not None:
+        for coluna, (rotulo, dx, dy) in zip(nav[1:], [("⬅️", -0.5, 0), ("➡️", 0.5, 0), ("⬆️", 0, 0.5), ("⬇️", 0, -0.5)]):
+            if coluna.button(rotulo, use_container_width=True):
+                mover_janela(dx, dy)
+                st.rerun()
+
+    px_por_m = escala_efetiva()
+    canvas_w, canvas_h, _, _ = tamanho_canvas()
 
-    if st.session_state["drawing"] is None:
-        st.session_state["drawing"] = comodos_to_drawing(terreno_w_m, terreno_h_m, st.session_state["comodos"], px_por_m)
+    drawing = obter_desenho()
 
     canvas_result = st_canvas(
         fill_color="rgba(0,0,0,0)",
@@ -606,25 +641,104 @@ with col_right:
         height=canvas_h,
         drawing_mode="transform",
         display_toolbar=False,
-        initial_drawing=st.session_state["drawing"],
+        initial_drawing=drawing,
         update_streamlit=True,
         key="planta_canvas_fixed",
     )
+    # Tempo até o primeiro canvas: uma vez por processo e uma vez por sessão
+    for registro in (METRICAS, metricas_sessao()):
+        if "primeiro_canvas" not in registro.etapas:
+            registro.observar("primeiro_canvas", (time.perf_counter() - inicio_rerun) * 1000.0)
 
     if canvas_result.json_data:
-        current_hash = get_hash(canvas_result.json_data)
-        if current_hash != st.session_state["last_canvas_hash"]:
-            sync_comodos_from_canvas(
-                canvas_result.json_data,
-                terreno_w_m,
-                terreno_h_m,
-                st.session_state["comodos"],
-                px_por_m,
-                snap_m=snap_m,
+        objs = canvas_result.json_data.get("objects", [])
+        ids = ids_objetos(objs, drawing)
+        with medir("impressoes", metricas_sessao()):
+            alterados, impressoes, aguardando = objetos_editados(
+                objs, ids, drawing, st.session_state["canvas_fps"], st.session_state["canvas_aguardando"]
             )
-            st.session_state["last_canvas_hash"] = current_hash
+        st.session_state["canvas_fps"] = impressoes
+        st.session_state["canvas_aguardando"] = aguardando
+        if alterados:
+            with medir("sync", metricas_sessao()):
+                encaixados = sync_comodos_from_canvas(
+                    canvas_result.json_data,
+                    terreno_w_m,
+                    terreno_h_m,
+                    st.session_state["comodos"],
+                    px_por_m,
+                    snap_m=snap_m,
+                    indice=st.session_state["indice"],
+                    encaixe_m=ENCAIXE_TOL_M if st.session_state["encaixe_vizinhos"] else 0.0,
+                    indices=alterados,
+                    ids=ids,
+                    viewport=viewport,
+                    por_id=st.session_state["por_id"],
+                )
+            registrar_revisao({ids[i] for i in alterados})
+            # As impressões são recalculáveis: passando do orçamento, o próximo evento sincroniza tudo
+            memoria().aplicar_orcamento({"canvas_fps": {}})
+            if encaixados:
+                atualizar_desenho()
+                st.rerun()
 
     st.caption("💡 Clique no bloco para selecionar, arraste para mover e use as alças para redimensionar.")
+    if viewport is not None:
+        st.caption(f"🔎 Mostrando {len(drawing['objects']) - 1} de {len(st.session_state['comodos'])} blocos nesta janela.")
+
+    sobrepostos = descrever_sobreposicoes(st.session_state["indice"], st.session_state["comodos"])
+    if sobrepostos:
+        st.warning("⚠️ Blocos sobrepostos: " + ", ".join(sobrepostos))
+
+    if st.toggle("📏 Quantitativos", key="painel_quantitativos"):
+        pe_direito_m = st.number_input("Pé-direito (m)", 2.0, 15.0, PE_DIREITO_M, step=0.10, key="pe_direito_m")
+        quant = quantitativos_atuais(float(pe_direito_m))
+        totais = quant["totais"]
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Área dos blocos", f"{totais['area_m2']:.2f} m²")
+        m2.metric("Paredes", f"{totais['comprimento_paredes_m']:.2f} m")
+        m3.metric("Volume de paredes", f"{totais['volume_paredes_m3']:.2f} m³")
+        st.dataframe(quant["paredes"], hide_index=True, use_container_width=True)
+        st.dataframe(quant["comodos"], hide_index=True, use_container_width=True)
+        st.download_button(
+            "⬇️ Baixar quantitativos (CSV)",
+            data=quantitativos_csv(quant),
+            file_name="quantitativos.csv",
+            mime="text/csv",
+        )
 
-    with st.expander("📋 Blocos (debug)"):
+    # Toggles, não expanders: o corpo de um expander fechado roda a cada rerun
+    if st.toggle("📋 Blocos (debug)", key="painel_blocos"):
         st.json(st.session_state["comodos"])
+
+    if st.toggle("💾 Memória", key="painel_memoria"):
+        st.json({
+            "sessao": memoria().relatorio(),
+            "cache_compartilhado": CACHE_DERIVADOS.estatisticas(),
+        })
+        # Varre o diretório inteiro do armazém: só quando pedido, não a cada rerun com o painel aberto
+        if st.button("Medir armazém em disco", key="medir_armazem"):
+            st.json({"armazem_disco": ARMAZEM.estatisticas()})
+
+# Reruns interrompidos por st.rerun() não chegam aqui; as etapas deles já foram medidas acima
+ms_rerun = (time.perf_counter() - inicio_rerun) * 1000.0
+metricas_sessao().observar("rerun", ms_rerun)
+METRICAS.observar("rerun", ms_rerun)
+
+with st.sidebar:
+    if st.toggle("⏱️ Tempos por etapa", key="painel_metricas"):
+        resumo = METRICAS.resumo()
+        carregadas = [nome for nome, ok in bibliotecas_carregadas().items() if ok]
+        st.markdown(
+            "**🚀 Partida do processo**  \n"
+            f"Imports do app: {resumo['imports']['max_ms']:.0f} ms · "
+            f"primeiro canvas: {resumo.get('primeiro_canvas', {}).get('max_ms', 0.0):.0f} ms  \n"
+            f"Bibliotecas de exportação neste processo: {', '.join(carregadas) or 'nenhuma (só nos workers)'}"
+        )
+        st.caption("Esta sessão (ms)")
+        st.dataframe(tabela_metricas(metricas_sessao()), hide_index=True)
+        st.caption("Processo inteiro (ms)")
+        st.dataframe(tabela_metricas(METRICAS), hide_index=True)
+        if st.button("💾 Salvar métricas", use_container_width=True):
+            caminhos = METRICAS.salvar(METRICAS_DIR)
+            st.success("Gravado em " + ", ".join(caminhos))
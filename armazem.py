@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem flock, vale só a trava entre threads
+    fcntl = None
+
+# ========================
+# Armazém em disco de arquivos exportados (endereçado por conteúdo)
+# ========================
+ARMAZEM_DIR = os.environ.get("AUTOPLANTAS_ARMAZEM_DIR", os.path.join(tempfile.gettempdir(), "autoplantas-exportacoes"))
+ARMAZEM_MAX_BYTES = int(os.environ.get("AUTOPLANTAS_ARMAZEM_MAX_BYTES", 1024 * 1024 * 1024))
+SUFIXO = ".bin"
+
+
+class ArmazemDisco:
+    """Arquivos exportados num diretório compartilhado por todos os processos do host.
+
+    O nome de cada arquivo é o hash da chave (planta + formato + parâmetros),
+    então qualquer réplica que peça a mesma exportação acha o arquivo pronto.
+    A gravação é atômica (arquivo temporário + rename no mesmo diretório) e a
+    leitura nunca vê um arquivo pela metade. Quando o total passa de
+    `max_bytes`, os arquivos usados há mais tempo (mtime, renovado a cada
+    leitura) são apagados; gravação e limpeza rodam sob um flock exclusivo.
+    """
+
+    def __init__(self, diretorio=ARMAZEM_DIR, max_bytes=ARMAZEM_MAX_BYTES):
+        self.diretorio = diretorio
+        self.max_bytes = max_bytes
+        self.acertos = 0
+        self.faltas = 0
+        self._trava = threading.Lock()
+
+    def _caminho(self, chave):
+        nome = hashlib.blake2b(chave.encode("utf-8"), digest_size=20).hexdigest()
+        return os.path.join(self.diretorio, nome[:2], nome + SUFIXO)
+
+    @contextmanager
+    def _exclusivo(self):
+        """Trava entre threads deste processo e, com fcntl, entre processos"""
+        with self._trava:
+            os.makedirs(self.diretorio, exist_ok=True)
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(self.diretorio, ".trava"), "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, chave):
+        caminho = self._caminho(chave)
+        try:
+            with open(caminho, "rb") as f:
+                dados = f.read()
+            os.utime(caminho)  # marca como usado agora (ordem do LRU)
+        except FileNotFoundError:
+            self.faltas += 1
+            return None
+        self.acertos += 1
+        return dados
+
+    def put(self, chave, dados):
+        caminho = self._caminho(chave)
+        pasta = os.path.dirname(caminho)
+        with self._exclusivo():
+            os.makedirs(pasta, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=pasta, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(dados)
+                os.replace(tmp, caminho)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+            self._limpar()
+
+    def _arquivos(self):
+        for pasta in os.scandir(self.diretorio):
+            if not pasta.is_dir():
+                continue
+            for entrada in os.scandir(pasta.path):
+                if entrada.name.endswith(SUFIXO):
+                    info = entrada.stat()
+                    yield info.st_mtime, info.st_size, entrada.path
+
+    def _limpar(self):
+        """Apaga os menos usados até caber em max_bytes (chamado com a trava exclusiva)"""
+        arquivos = sorted(self._arquivos())
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in arquivos:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(caminho)  # quem já abriu o arquivo continua lendo normalmente
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+
+    def estatisticas(self):
+        arquivos = list(self._arquivos()) if os.path.isdir(self.diretorio) else []
+        return {
+            "arquivos": len(arquivos), "bytes": sum(t for _, t, _ in arquivos), "max_bytes": self.max_bytes,
+            "acertos": self.acertos, "faltas": self.faltas,
+        }
+
+
+# Um por processo, mas o diretório é o mesmo para todas as réplicas do host
+ARMAZEM = ArmazemDisco()
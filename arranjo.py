@@ -0,0 +1,103 @@
+import math
+
+# ========================
+# Arranjo automático (empacotamento skyline)
+# ========================
+EPS = 1e-9
+
+
+def _acima(v, passo, origem):
+    """Menor valor >= v na grade `origem + k * passo`"""
+    if not passo or passo <= 0:
+        return v
+    return origem + math.ceil((v - origem) / passo - 1e-9) * passo
+
+
+class Skyline:
+    """Contorno superior dos blocos já colocados: segmentos [x, y, largura] em ordem de x"""
+
+    def __init__(self, x0, largura):
+        self.segmentos = [[x0, 0.0, largura]]
+
+    def altura(self, x, largura):
+        """Maior altura do contorno no intervalo [x, x + largura]"""
+        fim = x + largura
+        topo = 0.0
+        for sx, sy, sw in self.segmentos:
+            if sx >= fim - EPS:
+                break
+            if sx + sw > x + EPS:
+                topo = max(topo, sy)
+        return topo
+
+    def ocupar(self, x, y_topo, largura):
+        fim = x + largura
+        novos = []
+        for sx, sy, sw in self.segmentos:
+            sfim = sx + sw
+            if sfim <= x + EPS or sx >= fim - EPS:
+                novos.append([sx, sy, sw])
+                continue
+            if sx < x - EPS:
+                novos.append([sx, sy, x - sx])
+            if sfim > fim + EPS:
+                novos.append([fim, sy, sfim - fim])
+        novos.append([x, y_topo, largura])
+        novos.sort()
+
+        # Segmentos vizinhos na mesma altura viram um só
+        fundidos = [novos[0]]
+        for seg in novos[1:]:
+            ult = fundidos[-1]
+            if abs(ult[1] - seg[1]) <= EPS and abs(ult[0] + ult[2] - seg[0]) <= EPS:
+                ult[2] += seg[2]
+            else:
+                fundidos.append(seg)
+        self.segmentos = fundidos
+
+
+def arranjar(comodos, terreno_w_m, terreno_h_m, snap_m=0.0, esp_ext_m=0.0, girar=False):
+    """Empacota os cômodos no terreno com a heurística skyline (bottom-left).
+
+    Os blocos maiores entram primeiro; cada um vai para a posição de menor
+    topo (e, no empate, mais à esquerda) entre os inícios de segmento do
+    contorno. Blocos vizinhos encostam (a parede entre eles vira interna) e
+    todos ficam a meia parede externa das divisas do terreno, com a origem
+    na grade do snap. Com `girar`, cada bloco também é testado deitado.
+
+    Retorna ({id: (x, y, largura, comprimento)}, [ids que não couberam]).
+    """
+    borda = esp_ext_m / 2.0
+    x0, y0 = _acima(borda, snap_m, 0.0), _acima(borda, snap_m, 0.0)
+    x_max = terreno_w_m - borda
+    y_max = terreno_h_m - borda - y0
+    skyline = Skyline(x0, max(0.0, x_max - x0))
+
+    ordem = sorted(comodos, key=lambda c: (max(c["largura"], c["comprimento"]), c["largura"] * c["comprimento"]), reverse=True)
+    posicoes = {}
+    sobra = []
+    for c in ordem:
+        formas = [(c["largura"], c["comprimento"])]
+        if girar and c["largura"] != c["comprimento"]:
+            formas.append((c["comprimento"], c["largura"]))
+
+        melhor = None
+        for w, h in formas:
+            for sx, _, _ in skyline.segmentos:
+                x = _acima(sx, snap_m, x0)
+                if x + w > x_max + EPS:
+                    break
+                y = _acima(skyline.altura(x, w), snap_m, 0.0)
+                if y + h > y_max + EPS:
+                    continue
+                candidato = (y + h, x, y, w, h)
+                if melhor is None or candidato[:2] < melhor[:2]:
+                    melhor = candidato
+
+        if melhor is None:
+            sobra.append(c["id"])
+            continue
+        topo, x, y, w, h = melhor
+        skyline.ocupar(x, topo, w)
+        posicoes[c["id"]] = (round(x, 6), round(y + y0, 6), w, h)  # tira o ruído das somas de snap
+    return posicoes, sobra
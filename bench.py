@@ -0,0 +1,337 @@
+"""Benchmarks (sem Streamlit) das etapas pesadas do editor, com plantas sintéticas.
+
+Mede tempo (mediana de várias rodadas) e pico de memória de cada etapa para
+cada tipo de planta e número de blocos, e compara com uma linha de base
+gravada em JSON: se alguma medida piorar além da tolerância e do ruído medido,
+o processo termina com código 1. Tempos absolutos só valem na máquina em que
+foram medidos: a linha de base é local (fica fora do git) e é gravada a
+partir da revisão de referência, na mesma máquina, antes de medir a mudança.
+
+    git stash && python bench.py --salvar-base && git stash pop   # base da revisão anterior
+    python bench.py                               # mede e compara com a base
+    python bench.py --tamanhos 10,1000 --plantas grade --etapas paredes,dxf
+
+Plantas:
+    grade      blocos 3x4 m encostados (paredes internas compartilhadas)
+    aleatoria  blocos de tamanho aleatório sem sobreposição (semente fixa)
+    colinear   fileiras de blocos separados por frestas: muitas paredes na mesma linha
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+from desenho import comodos_to_drawing, ids_objetos, objetos_alterados, patch_drawing, sync_comodos_from_canvas
+from exportadores import GERADORES, GERADORES_STREAM
+from historico import Historico
+from indice import GradeEspacial
+from paredes import _extrair, extrair_paredes
+
+TIPOS = ["Escritório", "Banheiro", "Almoxarifado", "Produção", "Refeitório"]
+TAMANHOS = [10, 100, 1000, 10000, 50000]
+BASE_PADRAO = "bench_base.json"
+TOLERANCIA = 0.25  # piora relativa aceita antes de acusar regressão
+RUIDO_K = 3.0  # além da tolerância, aceita até RUIDO_K desvios (MAD) da medida mais ruidosa
+PISO_S = 0.005  # diferenças de tempo menores que isso são ruído
+PISO_MB = 1.0
+
+
+# ========================
+# Plantas sintéticas
+# ========================
+def _comodo(n, x, y, largura, comprimento):
+    return {
+        "id": f"c_{n:06d}", "nome": TIPOS[n % len(TIPOS)],
+        "x": round(x, 2), "y": round(y, 2), "largura": round(largura, 2), "comprimento": round(comprimento, 2),
+    }
+
+
+def planta_grade(n, semente=0):
+    colunas = math.ceil(math.sqrt(n))
+    linhas = math.ceil(n / colunas)
+    comodos = [_comodo(i, (i % colunas) * 3.0, (i // colunas) * 4.0, 3.0, 4.0) for i in range(n)]
+    return {"terreno_w_m": colunas * 3.0, "terreno_h_m": linhas * 4.0, "comodos": comodos}
+
+
+def planta_aleatoria(n, semente=0):
+    """Um bloco por célula de 5x5 m (células sorteadas), então nunca há sobreposição"""
+    rnd = random.Random(semente)
+    colunas = math.ceil(math.sqrt(2 * n))
+    celulas = rnd.sample(range(colunas * colunas), n)
+    comodos = []
+    for i, celula in enumerate(celulas):
+        largura = rnd.uniform(1.0, 4.5)
+        comprimento = rnd.uniform(1.0, 4.5)
+        # Folga de 5 cm nas bordas da célula: o arredondamento não cria sobreposição
+        x = (celula % colunas) * 5.0 + rnd.uniform(0.05, 4.95 - largura)
+        y = (celula // colunas) * 5.0 + rnd.uniform(0.05, 4.95 - comprimento)
+        comodos.append(_comodo(i, x, y, largura, comprimento))
+    return {"terreno_w_m": colunas * 5.0, "terreno_h_m": colunas * 5.0, "comodos": comodos}
+
+
+def planta_colinear(n, semente=0):
+    """Pior caso da varredura: cada linha horizontal tem centenas de trechos separados"""
+    por_fileira = max(1, math.ceil(math.sqrt(n)) * 4)
+    fileiras = math.ceil(n / por_fileira)
+    comodos = [_comodo(i, (i % por_fileira) * 1.5, (i // por_fileira) * 2.0, 1.0, 2.0) for i in range(n)]
+    return {"terreno_w_m": por_fileira * 1.5, "terreno_h_m": fileiras * 2.0, "comodos": comodos}
+
+
+PLANTAS = {"grade": planta_grade, "aleatoria": planta_aleatoria, "colinear": planta_colinear}
+
+
+# ========================
+# Etapas medidas
+# ========================
+# Cada etapa recebe a planta e devolve a função a cronometrar; o preparo fica fora da medida.
+# canvas/patch/sync rodam as mesmas funções do editor (desenho.py), objeto a objeto.
+PARAMS = {"esp_ext_m": 0.20, "esp_int_m": 0.12, "margem_m": 0.50}
+PX_POR_M = 40.0
+SNAP_M = 0.10
+ENCAIXE_M = 0.30  # app.ENCAIXE_TOL_M
+
+
+def etapa_paredes(planta):
+    comodos = planta["comodos"]
+
+    def rodar():
+        _extrair.cache_clear()  # sem isso, só a primeira repetição extrairia de fato
+        extrair_paredes(comodos)
+    return rodar
+
+
+def etapa_canvas(planta):
+    """comodos_to_drawing: o drawing inteiro, como na primeira carga do editor"""
+    args = (planta["terreno_w_m"], planta["terreno_h_m"], planta["comodos"], PX_POR_M)
+
+    def rodar():
+        comodos_to_drawing(*args)
+    return rodar
+
+
+def etapa_patch(planta):
+    """patch_drawing depois de todos os blocos mudarem de lugar (desfazer, organizar, abrir)"""
+    h = planta["terreno_h_m"]
+    comodos = planta["comodos"]
+    deslocados = [{**c, "x": c["x"] + SNAP_M} for c in comodos]
+    drawing = comodos_to_drawing(planta["terreno_w_m"], h, comodos, PX_POR_M)
+    estados = [comodos, deslocados]
+
+    def rodar():
+        estados.reverse()  # alterna: toda rodada move todos os blocos
+        patch_drawing(drawing, h, estados[0], PX_POR_M)
+    return rodar
+
+
+def _respostas_canvas(planta, arrastar):
+    """(cômodos, índice, drawing enviado, [resposta com os objetos de `arrastar` movidos, resposta igual ao enviado])"""
+    comodos = [dict(c) for c in planta["comodos"]]
+    indice = GradeEspacial()
+    indice.reconstruir(comodos)
+    drawing = comodos_to_drawing(planta["terreno_w_m"], planta["terreno_h_m"], comodos, PX_POR_M)
+    movida = {"objects": [dict(o) for o in drawing["objects"]]}
+    for i in arrastar:
+        if i < len(movida["objects"]):
+            movida["objects"][i]["left"] += SNAP_M * PX_POR_M
+    return comodos, indice, drawing, [movida, {"objects": [dict(o) for o in drawing["objects"]]}]
+
+
+def etapa_sync(planta):
+    """Um evento do canvas: ids e impressões de todos os objetos, sync só do bloco arrastado"""
+    w, h = planta["terreno_w_m"], planta["terreno_h_m"]
+    comodos, indice, drawing, respostas = _respostas_canvas(planta, [1])
+    por_id = {c["id"]: c for c in comodos}  # o app mantém o mapa no session_state
+    objs = respostas[1]["objects"]
+    fps = [objetos_alterados(objs, ids_objetos(objs, drawing), {})[1]]
+
+    def rodar():
+        respostas.reverse()  # alterna: arrastado e de volta
+        objs = respostas[0]["objects"]
+        ids = ids_objetos(objs, drawing)
+        alterados, fps[0] = objetos_alterados(objs, ids, fps[0])
+        sync_comodos_from_canvas(
+            respostas[0], w, h, comodos, PX_POR_M, SNAP_M,
+            indice=indice, encaixe_m=ENCAIXE_M, indices=alterados, ids=ids, por_id=por_id,
+        )
+    return rodar
+
+
+def etapa_sync_total(planta):
+    """Resincronização completa (sem impressões anteriores): todos os objetos passam pelo sync"""
+    w, h = planta["terreno_w_m"], planta["terreno_h_m"]
+    n = len(planta["comodos"])
+    comodos, indice, drawing, respostas = _respostas_canvas(planta, range(1, n + 1))
+
+    def rodar():
+        respostas.reverse()
+        objs = respostas[0]["objects"]
+        sync_comodos_from_canvas(
+            respostas[0], w, h, comodos, PX_POR_M, SNAP_M,
+            indice=indice, encaixe_m=ENCAIXE_M, ids=ids_objetos(objs, drawing),
+        )
+    return rodar
+
+
+def etapa_revisao(planta):
+    """Historico.registrar depois de um arrasto: só a fatia do bloco movido é refeita"""
+    comodos = [dict(c) for c in planta["comodos"]]
+    historico = Historico(comodos)
+    movido = comodos[len(comodos) // 2]
+
+    def rodar():
+        movido["x"] += SNAP_M
+        historico.registrar(comodos, {movido["id"]})
+    return rodar
+
+
+def etapa_exportar(formato):
+    def etapa(planta):
+        args = (planta["terreno_w_m"], planta["terreno_h_m"], planta["comodos"])
+
+        def rodar():
+            _extrair.cache_clear()
+            if formato in GERADORES_STREAM:
+                for _ in GERADORES_STREAM[formato](*args, **PARAMS):
+                    pass
+            else:
+                GERADORES[formato](*args, **PARAMS)
+        return rodar
+    return etapa
+
+
+ETAPAS = {
+    "paredes": etapa_paredes,
+    "canvas": etapa_canvas,
+    "patch": etapa_patch,
+    "sync": etapa_sync,
+    "sync_total": etapa_sync_total,
+    "revisao": etapa_revisao,
+    "dxf": etapa_exportar("dxf"),
+    "dxf_r12": etapa_exportar("dxf_r12"),
+    "pdf": etapa_exportar("pdf"),
+    "svg": etapa_exportar("svg"),
+}
+
+
+def medir(rodar, repeticoes):
+    """{"s": mediana, "ruido_s": desvio (MAD), "pico_mb"}; o pico vem de uma rodada à parte com tracemalloc"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        rodar()
+        tempos.append(time.perf_counter() - inicio)
+    mediana = statistics.median(tempos)
+    ruido = 1.4826 * statistics.median(abs(t - mediana) for t in tempos)
+    tracemalloc.start()
+    try:
+        rodar()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"s": round(mediana, 6), "ruido_s": round(ruido, 6), "pico_mb": round(pico / (1024 * 1024), 3)}
+
+
+# ========================
+# Linha de base
+# ========================
+def ambiente():
+    """Onde as medidas foram feitas: só se compara com uma base do mesmo ambiente"""
+    return {"host": platform.node(), "python": platform.python_version(), "maquina": platform.machine()}
+
+
+def piorou(atual, antigo, tolerancia):
+    """O tempo passou da tolerância relativa somada ao ruído das duas medidas?"""
+    ruido = max(atual.get("ruido_s", 0.0), antigo.get("ruido_s", 0.0))
+    limite = antigo["s"] * (1 + tolerancia) + RUIDO_K * ruido
+    return atual["s"] > limite and atual["s"] - antigo["s"] > PISO_S
+
+
+def comparar(resultados, base, tolerancia):
+    """Lista de regressões (texto) das medidas que pioraram além da tolerância"""
+    regressoes = []
+    for chave, atual in resultados.items():
+        antigo = base.get(chave)
+        if antigo is None:
+            continue
+        if piorou(atual, antigo, tolerancia):
+            regressoes.append(f"{chave}: tempo {antigo['s']:.4f}s -> {atual['s']:.4f}s")
+        if atual["pico_mb"] > antigo["pico_mb"] * (1 + tolerancia) and atual["pico_mb"] - antigo["pico_mb"] > PISO_MB:
+            regressoes.append(f"{chave}: memória {antigo['pico_mb']:.1f}MB -> {atual['pico_mb']:.1f}MB")
+    return regressoes
+
+
+def _lista(texto, validos, nome):
+    itens = [t.strip() for t in texto.split(",") if t.strip()]
+    invalidos = [t for t in itens if t not in validos]
+    if invalidos:
+        raise SystemExit(f"{nome} desconhecida(s): {', '.join(invalidos)}")
+    return itens
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks das etapas do editor com plantas sintéticas.")
+    parser.add_argument("--plantas", default=",".join(PLANTAS), help="tipos de planta (padrão: todos)")
+    parser.add_argument("--tamanhos", default=",".join(map(str, TAMANHOS)), help="números de blocos (padrão: 10 a 50000)")
+    parser.add_argument("--etapas", default=",".join(ETAPAS), help="etapas medidas (padrão: todas)")
+    parser.add_argument("--repeticoes", type=int, default=5, help="rodadas por medida; vale a mediana (padrão: 5)")
+    parser.add_argument("--base", default=BASE_PADRAO, help=f"arquivo da linha de base (padrão: {BASE_PADRAO})")
+    parser.add_argument("--salvar-base", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA, help="piora relativa aceita (padrão: 0.25)")
+    args = parser.parse_args(argv)
+
+    plantas = _lista(args.plantas, PLANTAS, "planta")
+    etapas = _lista(args.etapas, ETAPAS, "etapa")
+    tamanhos = [int(t) for t in args.tamanhos.split(",") if t.strip()]
+
+    base = None
+    if os.path.exists(args.base):
+        with open(args.base, encoding="utf-8") as f:
+            base = json.load(f)
+        if base.get("ambiente") != ambiente():
+            if not args.salvar_base:
+                print(f"a linha de base ({args.base}) foi medida em outro ambiente: {base.get('ambiente')}; "
+                      "grave-a de novo nesta máquina com --salvar-base", file=sys.stderr)
+                return 1
+            base = None  # substituída inteira: não mistura medidas de ambientes diferentes
+    elif not args.salvar_base:
+        print(f"sem linha de base ({args.base}); grave-a com --salvar-base na revisão de referência", file=sys.stderr)
+        return 1
+
+    repeticoes = max(1, args.repeticoes)
+    resultados = {}
+    for tipo in plantas:
+        for n in tamanhos:
+            planta = PLANTAS[tipo](n)
+            for etapa in etapas:
+                chave = f"{tipo}/{n}/{etapa}"
+                medida = medir(ETAPAS[etapa](planta), repeticoes)
+                antigo = (base or {}).get("resultados", {}).get(chave)
+                if not args.salvar_base and antigo is not None and piorou(medida, antigo, args.tolerancia):
+                    # Confirma antes de acusar: uma rodada lenta da máquina inteira não é regressão
+                    medida = min(medida, medir(ETAPAS[etapa](planta), repeticoes), key=lambda m: m["s"])
+                resultados[chave] = medida
+                print(f"{chave:<28} {medida['s'] * 1000:>10.2f} ms ±{medida['ruido_s'] * 1000:<7.2f} "
+                      f"{medida['pico_mb']:>9.2f} MB", flush=True)
+
+    if args.salvar_base:
+        medidas = {**(base or {}).get("resultados", {}), **resultados}
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump({"ambiente": ambiente(), "resultados": medidas}, f, indent=2, sort_keys=True)
+        print(f"linha de base gravada em {args.base}")
+        return 0
+
+    regressoes = comparar(resultados, base["resultados"], args.tolerancia)
+    for r in regressoes:
+        print(f"REGRESSÃO {r}", file=sys.stderr)
+    print(f"{len(resultados)} medida(s), {len(regressoes)} regressão(ões)")
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
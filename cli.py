@@ -0,0 +1,176 @@
+"""Geração em lote (sem Streamlit) de DXF/PDF/SVG a partir de definições de plantas.
+
+Cada planta é um objeto JSON com as mesmas chaves do editor:
+
+    {"nome": "galpao-01", "terreno_w_m": 40, "terreno_h_m": 80,
+     "esp_ext_m": 0.20, "esp_int_m": 0.12, "margem_m": 0.50,
+     "comodos": [{"nome": "Escritório", "x": 0, "y": 0, "largura": 3, "comprimento": 4}]}
+
+Entrada: um diretório com arquivos *.json, *.aplt ou *.dxf (uma planta por
+arquivo, ver persistencia.py e importador.py) ou um arquivo .jsonl (uma
+planta por linha).
+
+    python cli.py plantas.jsonl -o saida/ --formatos dxf,pdf --processos 8
+    python cli.py plantas/ --formatos pdf_folhas --escala-pdf 50
+    python cli.py plantas/ --formatos zip --nivel-zip 9
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from exportadores import ESCALAS_PDF, EXTENSOES, GERADORES, GERADORES_STREAM, NIVEL_ZIP
+from importador import importar_dxf
+from persistencia import EXTENSAO, abrir_planta
+
+PADROES = {"esp_ext_m": 0.20, "esp_int_m": 0.12, "margem_m": 0.50}
+
+
+def _ler_json(texto):
+    planta = json.loads(texto)
+    if not isinstance(planta, dict):
+        raise ValueError("esperado um objeto JSON com a planta")
+    return planta
+
+
+def ler_plantas(origem):
+    """Gera (nome, planta, erro) sob demanda — o lote nunca é carregado inteiro na memória.
+
+    Uma planta que não pôde ser lida vem com `planta` None e a exceção em
+    `erro`, para ser contada como falha sem interromper o lote.
+    """
+    if os.path.isdir(origem):
+        for arquivo in sorted(os.listdir(origem)):
+            nome = os.path.splitext(arquivo)[0]
+            caminho = os.path.join(origem, arquivo)
+            try:
+                if arquivo.endswith(EXTENSAO):
+                    planta, meta = abrir_planta(caminho)
+                    yield nome, {**meta, "comodos": planta.to_comodos()}, None
+                    continue
+                if arquivo.lower().endswith(".dxf"):
+                    # A leitura do DXF é o passo caro: fica para o worker (ver planta_de_dxf)
+                    yield nome, {"arquivo_dxf": caminho}, None
+                    continue
+                if not arquivo.endswith(".json"):
+                    continue
+                with open(caminho, encoding="utf-8") as f:
+                    planta = _ler_json(f.read())
+            except (OSError, ValueError) as e:
+                yield arquivo, None, e
+                continue
+            yield planta.get("nome") or nome, planta, None
+        return
+
+    with open(origem, encoding="utf-8") as f:
+        for n, linha in enumerate(f, start=1):
+            linha = linha.strip()
+            if not linha:
+                continue
+            try:
+                planta = _ler_json(linha)
+            except ValueError as e:
+                yield f"linha {n}", None, e
+                continue
+            yield planta.get("nome") or f"planta_{n:05d}", planta, None
+
+
+def planta_de_dxf(caminho):
+    """(planta, avisos) reconstruída de um DXF; um desenho sem cômodos é erro"""
+    comodos, meta, avisos = importar_dxf(caminho)
+    if not comodos:
+        raise ValueError("nenhum cômodo encontrado no DXF")
+    return {**meta, "comodos": comodos}, avisos
+
+
+def renderizar(nome, planta, formatos, destino, opcoes=None):
+    """Gera os formatos pedidos de uma planta e grava direto no disco (roda no worker)
+
+    `opcoes` traz parâmetros extras por formato, ex.: {"pdf_folhas": {"escala": 50}}.
+    Retorna (nome, caminhos, segundos, avisos da importação).
+    """
+    opcoes = opcoes or {}
+    inicio = time.perf_counter()
+    avisos = []
+    if "arquivo_dxf" in planta:
+        planta, avisos = planta_de_dxf(planta["arquivo_dxf"])
+    params = {k: float(planta.get(k, v)) for k, v in PADROES.items()}
+    caminhos = []
+    args = (float(planta["terreno_w_m"]), float(planta["terreno_h_m"]), planta.get("comodos", []))
+    for formato in formatos:
+        caminho = os.path.join(destino, f"{nome}.{EXTENSOES.get(formato, formato)}")
+        kwargs = {**params, **opcoes.get(formato, {})}
+        with open(caminho, "wb") as f:
+            if formato in GERADORES_STREAM:
+                for pedaco in GERADORES_STREAM[formato](*args, **kwargs):
+                    f.write(pedaco)
+            else:
+                dados = GERADORES[formato](*args, **kwargs)
+                f.write(dados.encode("utf-8") if isinstance(dados, str) else dados)
+        caminhos.append(caminho)
+    return nome, caminhos, time.perf_counter() - inicio, avisos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera DXF/PDF/SVG de várias plantas em paralelo.")
+    parser.add_argument("origem", help="diretório com *.json/*.aplt/*.dxf ou arquivo .jsonl")
+    parser.add_argument("-o", "--saida", default="saida", help="diretório de saída (padrão: saida)")
+    parser.add_argument("--formatos", default="dxf,pdf,svg", help="lista separada por vírgulas (padrão: dxf,pdf,svg)")
+    parser.add_argument("--escala-pdf", type=int, default=100, choices=ESCALAS_PDF,
+                        help="escala 1:N do formato pdf_folhas (padrão: 100)")
+    parser.add_argument("--nivel-zip", type=int, default=NIVEL_ZIP, choices=range(10), metavar="0-9",
+                        help=f"compressão do formato zip (DXF+PDF+SVG num pacote; padrão: {NIVEL_ZIP})")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1, help="processos em paralelo (padrão: todos os núcleos)")
+    args = parser.parse_args(argv)
+
+    formatos = [f.strip().lower() for f in args.formatos.split(",") if f.strip()]
+    invalidos = [f for f in formatos if f not in GERADORES]
+    if invalidos:
+        parser.error(f"formato(s) desconhecido(s): {', '.join(invalidos)}")
+    os.makedirs(args.saida, exist_ok=True)
+
+    inicio = time.perf_counter()
+    total = falhas = 0
+    # Mantém no máximo 2 plantas por processo em voo para não acumular o lote em memória
+    limite = max(1, args.processos) * 2
+    with ProcessPoolExecutor(max_workers=max(1, args.processos)) as pool:
+        pendentes = {}
+
+        def coletar(concluidos):
+            nonlocal total, falhas
+            for fut in concluidos:
+                nome = pendentes.pop(fut)
+                try:
+                    _, caminhos, segundos, avisos = fut.result()
+                except Exception as e:
+                    falhas += 1
+                    print(f"ERRO {nome}: {e}", file=sys.stderr)
+                    continue
+                for aviso in avisos:
+                    print(f"AVISO {nome}: {aviso}", file=sys.stderr)
+                total += 1
+                print(f"{nome}: {', '.join(caminhos)} ({segundos:.2f}s)")
+
+        for nome, planta, erro in ler_plantas(args.origem):
+            if erro is not None:
+                falhas += 1
+                print(f"ERRO {nome}: {erro}", file=sys.stderr)
+                continue
+            if len(pendentes) >= limite:
+                concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                coletar(concluidos)
+            opcoes = {"pdf_folhas": {"escala": args.escala_pdf}, "zip": {"nivel": args.nivel_zip}}
+            pendentes[pool.submit(renderizar, nome, planta, formatos, args.saida, opcoes)] = nome
+
+        while pendentes:
+            concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+            coletar(concluidos)
+
+    print(f"{total} planta(s) geradas, {falhas} falha(s) em {time.perf_counter() - inicio:.1f}s")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
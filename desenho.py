@@ -0,0 +1,306 @@
+import hashlib
+import math
+import struct
+
+from planta import Planta, metros_para_pixels, pixels_para_metros
+
+# ========================
+# Canvas (Fabric.js) <-> cômodos
+# ========================
+# Nada aqui depende do Streamlit: o app.py chama estas funções a cada rerun e
+# o bench.py mede as mesmas funções com plantas sintéticas.
+def clamp(v, vmin, vmax):
+    return max(vmin, min(v, vmax))
+
+
+# ========================
+# Objetos devolvidos pelo canvas
+# ========================
+GEOMETRIA = (("left", 0.0), ("top", 0.0), ("width", 0.0), ("height", 0.0), ("scaleX", 1.0), ("scaleY", 1.0))
+TOL_ECO_PX = 0.01  # o Fabric.js devolve as coordenadas com 2 casas decimais
+
+
+def _geometria(obj):
+    return [float(obj.get(k, padrao) or padrao) for k, padrao in GEOMETRIA]
+
+
+def impressao_objeto(obj) -> bytes:
+    """Impressão digital compacta (blake2b) só dos campos de geometria de um objeto Fabric.js"""
+    return hashlib.blake2b(struct.pack("<6d", *_geometria(obj)), digest_size=8).digest()
+
+
+def ids_objetos(objs, referencia=None):
+    """Id do cômodo de cada objeto do canvas.
+
+    Usa o "id" embutido no objeto; se o canvas não o devolver, recorre ao objeto
+    na mesma posição do drawing enviado (`referencia`), cuja ordem o canvas preserva.
+    """
+    ref = (referencia or {}).get("objects", [])
+    ids = []
+    for i, obj in enumerate(objs):
+        oid = obj.get("id")
+        if oid is None and i < len(ref):
+            oid = ref[i].get("id")
+        ids.append(oid)
+    return ids
+
+
+def objetos_alterados(objs, ids, impressoes_anteriores):
+    """Índices dos objetos cuja geometria mudou desde o último evento, e as impressões atuais (por id)"""
+    impressoes = {}
+    alterados = []
+    for i, (obj, oid) in enumerate(zip(objs, ids)):
+        fp = impressao_objeto(obj)
+        impressoes[oid] = fp
+        if impressoes_anteriores.get(oid) != fp:
+            alterados.append(i)
+    return alterados, impressoes
+
+
+def eco_coerente(objs, ids, drawing):
+    """O canvas devolveu coordenadas na mesma janela e escala do drawing enviado?
+
+    Logo depois de trocar a janela (ou o zoom), o Streamlit ainda entrega o
+    último valor do componente, medido na janela anterior; sincronizar esse
+    eco gravaria posições erradas. O retângulo do terreno denuncia a diferença.
+    """
+    enviado = next((o for o in drawing.get("objects", []) if o.get("id") == TERRENO_ID), None)
+    eco = next((o for o, oid in zip(objs, ids) if oid == TERRENO_ID), None)
+    if enviado is None or eco is None:
+        return True
+    return all(
+        math.isclose(float(eco.get(k, 0.0) or 0.0), float(enviado.get(k, 0.0) or 0.0), abs_tol=1e-6)
+        for k in ("left", "top", "width", "height")
+    )
+
+
+def _mesma_geometria(obj, enviado):
+    return all(
+        math.isclose(a, b, abs_tol=TOL_ECO_PX) for a, b in zip(_geometria(obj), _geometria(enviado))
+    )
+
+
+def espelha_drawing(objs, drawing):
+    """O valor do canvas é o próprio drawing enviado (o eco de quando ele foi carregado)?"""
+    enviados = drawing.get("objects", [])
+    if len(objs) != len(enviados):
+        return False
+    return all(_mesma_geometria(obj, env) for obj, env in zip(objs, enviados))
+
+
+def assinatura_valor(objs) -> bytes:
+    """Impressão do valor inteiro do canvas (geometria em ordem, sem depender dos ids)"""
+    h = hashlib.blake2b(digest_size=16)
+    for obj in objs:
+        h.update(impressao_objeto(obj))
+    return h.digest()
+
+
+def diferentes_do_drawing(objs, ids, drawing):
+    """Índices dos objetos do canvas que não batem com o drawing enviado"""
+    enviados = {o.get("id"): o for o in drawing.get("objects", [])}
+    return [
+        i for i, (obj, oid) in enumerate(zip(objs, ids))
+        if oid not in enviados or not _mesma_geometria(obj, enviados[oid])
+    ]
+
+
+def objetos_editados(objs, ids, drawing, impressoes_anteriores, aguardando_eco):
+    """(alterados, impressões, aguardando_eco) de um valor do canvas.
+
+    O Streamlit repete o último valor do componente a cada rerun até o
+    navegador mandar outro. Depois de uma mudança feita pelo app (desfazer,
+    organizar, abrir, encaixe...) esse valor ainda é o da planta anterior e
+    sincronizá-lo desfaria a mudança: com `aguardando_eco`, nada é sincronizado
+    até o canvas devolver o drawing enviado. As impressões guardadas são sempre
+    as do valor do canvas, nunca as do drawing enviado.
+
+    `aguardando_eco` começa como True; no primeiro valor vira a assinatura dele
+    (o valor velho). Se chegar um valor que não é nem o velho nem o eco, o
+    navegador já carregou o drawing e o usuário mexeu antes do eco ser lido:
+    os objetos que diferem do drawing enviado são a edição.
+    """
+    if not eco_coerente(objs, ids, drawing):
+        return [], impressoes_anteriores, aguardando_eco
+    if aguardando_eco:
+        impressoes = {oid: impressao_objeto(obj) for obj, oid in zip(objs, ids)}
+        if espelha_drawing(objs, drawing):
+            return [], impressoes, False
+        assinatura = assinatura_valor(objs)
+        if aguardando_eco is True or aguardando_eco == assinatura:
+            return [], impressoes_anteriores, assinatura
+        return diferentes_do_drawing(objs, ids, drawing), impressoes, False
+    alterados, impressoes = objetos_alterados(objs, ids, impressoes_anteriores)
+    return alterados, impressoes, False
+
+
+# ========================
+# Cômodos -> drawing
+# ========================
+TERRENO_ID = "terreno"
+
+
+def novo_objeto(cid):
+    """Objeto Fabric.js de um cômodo, ainda sem geometria"""
+    return {
+        "type": "rect",
+        "id": cid,
+        "fill": "rgba(160,203,232,0.5)",
+        "stroke": "blue",
+        "strokeWidth": 2,
+        "objectCaching": False,
+    }
+
+
+def deslocamento(viewport):
+    """Canto (ox, oy) da janela visível, em pixels do terreno inteiro"""
+    if not viewport:
+        return 0.0, 0.0
+    return float(viewport["ox"]), float(viewport["oy"])
+
+
+def planta_visivel(comodos, terreno_h_m, px_por_m, viewport):
+    """Planta só com os blocos que aparecem na janela (todos, sem viewport)"""
+    planta = Planta.from_comodos(comodos)
+    if not viewport:
+        return planta
+    ox, oy = deslocamento(viewport)
+    x0 = ox / px_por_m
+    x1 = (ox + viewport["w"]) / px_por_m
+    y1 = terreno_h_m - oy / px_por_m
+    y0 = terreno_h_m - (oy + viewport["h"]) / px_por_m
+    return planta.selecionar(planta.na_janela(x0, y0, x1, y1))
+
+
+def posicionar_objetos(objs, planta, terreno_h_m, px_por_m, viewport=None):
+    """Escreve a geometria da planta (em lote) nos objetos correspondentes"""
+    left, top, width, height = metros_para_pixels(
+        planta.x, planta.y, planta.largura, planta.comprimento, terreno_h_m, px_por_m
+    )
+    ox, oy = deslocamento(viewport)
+    left = left - ox
+    top = top - oy
+    for obj, l, t, w, h in zip(objs, left.tolist(), top.tolist(), width.tolist(), height.tolist()):
+        obj["left"] = l
+        obj["top"] = t
+        obj["width"] = w
+        obj["height"] = h
+        obj["scaleX"] = 1.0
+        obj["scaleY"] = 1.0
+    return objs
+
+
+def comodos_to_drawing(terreno_w_m, terreno_h_m, comodos, px_por_m, viewport=None):
+    """Converte cômodos para formato Fabric.js.
+
+    Com `viewport` ({"ox", "oy", "w", "h"} em pixels), só os blocos que tocam a
+    janela visível são enviados, já deslocados para as coordenadas dela.
+    """
+    ox, oy = deslocamento(viewport)
+    objects = [{
+        "type": "rect",
+        "id": TERRENO_ID,
+        "left": -ox,
+        "top": -oy,
+        "width": float(terreno_w_m * px_por_m),
+        "height": float(terreno_h_m * px_por_m),
+        "fill": "rgba(240,240,240,1)",
+        "stroke": "black",
+        "strokeWidth": 2,
+        "selectable": False,
+        "evented": False,
+        "objectCaching": False,
+    }]
+
+    planta = planta_visivel(comodos, terreno_h_m, px_por_m, viewport)
+    objects.extend(posicionar_objetos([novo_objeto(cid) for cid in planta.ids], planta, terreno_h_m, px_por_m, viewport))
+
+    return {"version": "4.4.0", "objects": objects}
+
+
+def patch_drawing(drawing, terreno_h_m, comodos, px_por_m, viewport=None):
+    """Ajusta o drawing existente aos cômodos, casando objetos por id.
+
+    Objetos de cômodos removidos saem, novos entram e a ordem segue `comodos`;
+    os objetos que continuam são reaproveitados e só têm a geometria atualizada.
+    """
+    existentes = {o.get("id"): o for o in drawing["objects"]}
+    planta = planta_visivel(comodos, terreno_h_m, px_por_m, viewport)
+    objs = [existentes.get(cid) or novo_objeto(cid) for cid in planta.ids]
+    drawing["objects"] = [existentes.get(TERRENO_ID, drawing["objects"][0])]
+    drawing["objects"].extend(posicionar_objetos(objs, planta, terreno_h_m, px_por_m, viewport))
+    return drawing
+
+
+# ========================
+# Drawing -> cômodos
+# ========================
+def sync_comodos_from_canvas(drawing, terreno_w_m, terreno_h_m, comodos, px_por_m, snap_m, indice=None, encaixe_m=0.0, indices=None, ids=None, viewport=None, por_id=None):
+    """Sincroniza comodos a partir do drawing do canvas.
+
+    Objetos e cômodos são casados pelo id (`ids`, ver ids_objetos), não pela posição.
+    `indices` restringe a sincronização aos objetos alterados (ver objetos_alterados);
+    sem ele, todos os objetos são processados.
+
+    Com `indice`, a grade espacial é atualizada só para os blocos alterados e,
+    se `encaixe_m` > 0, o bloco movido encosta nas bordas dos vizinhos próximos.
+    Retorna os ids cuja posição o encaixe mudou (o drawing precisa ser ajustado).
+    Com `viewport`, as coordenadas do canvas são relativas à janela visível.
+    `por_id` (id -> dict de `comodos`) evita remontar o mapa a cada evento.
+    """
+    encaixados = set()
+    if not drawing or "objects" not in drawing:
+        return encaixados
+
+    objs = drawing.get("objects", [])
+    if len(objs) <= 1:
+        return encaixados
+
+    if ids is None:
+        ids = ids_objetos(objs)
+    if por_id is None:
+        por_id = {c["id"]: c for c in comodos}
+
+    if indices is None:
+        indices = range(1, len(objs))
+
+    # Converte todos os objetos alterados de uma vez (snap + clamp em lote)
+    lote = []
+    for i in indices:
+        if i >= len(objs):
+            continue
+        obj = objs[i]
+        com = por_id.get(ids[i])
+        if com is None or obj.get("type") != "rect":
+            continue
+        lote.append((com, obj))
+    if not lote:
+        return encaixados
+
+    ox, oy = deslocamento(viewport)
+    left_px = [float(obj.get("left", 0.0) or 0.0) + ox for _, obj in lote]
+    top_px = [float(obj.get("top", 0.0) or 0.0) + oy for _, obj in lote]
+    w_px = [float(obj.get("width", 0.0) or 0.0) * float(obj.get("scaleX", 1.0) or 1.0) for _, obj in lote]
+    h_px = [float(obj.get("height", 0.0) or 0.0) * float(obj.get("scaleY", 1.0) or 1.0) for _, obj in lote]
+    xs, ys, ws, hs = pixels_para_metros(left_px, top_px, w_px, h_px, terreno_w_m, terreno_h_m, px_por_m, snap_m)
+
+    for (com, _), x_m, y_m, w_m, h_m in zip(lote, xs.tolist(), ys.tolist(), ws.tolist(), hs.tolist()):
+        movido = (x_m, y_m, w_m, h_m) != (com["x"], com["y"], com["largura"], com["comprimento"])
+
+        if indice is not None and movido and encaixe_m > 0:
+            ex, ey = indice.encaixar(com["id"], x_m, y_m, w_m, h_m, encaixe_m)
+            ex = clamp(ex, 0.0, max(0.0, terreno_w_m - w_m))
+            ey = clamp(ey, 0.0, max(0.0, terreno_h_m - h_m))
+            if (ex, ey) != (x_m, y_m):
+                x_m, y_m = ex, ey
+                encaixados.add(com["id"])
+
+        com["x"] = float(x_m)
+        com["y"] = float(y_m)
+        com["largura"] = float(w_m)
+        com["comprimento"] = float(h_m)
+
+        if indice is not None and movido:
+            indice.atualizar(com["id"], com["x"], com["y"], com["largura"], com["comprimento"])
+
+    return encaixados
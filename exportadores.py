@@ -0,0 +1,583 @@
+import codecs
+import gzip
+import io
+import math
+import time
+import zipfile
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from xml.sax.saxutils import escape
+import re
+import unicodedata
+from metricas import medir
+from paredes import extrair_paredes, geometria_comodos, q
+
+# ========================
+# Bibliotecas de exportação (carregadas só na primeira exportação)
+# ========================
+# ezdxf e reportlab custam caro para importar e a maioria das interações do
+# editor não exporta nada; depois da primeira carga ficam em memória.
+@lru_cache(maxsize=None)
+def _ezdxf():
+    """(ezdxf, r12writer, TextEntityAlignment ou None nas versões antigas)"""
+    with medir("carregar_ezdxf"):
+        import ezdxf
+        from ezdxf.addons import r12writer
+        try:
+            from ezdxf.enums import TextEntityAlignment as TEA
+        except Exception:
+            TEA = None
+    return ezdxf, r12writer, TEA
+
+
+@lru_cache(maxsize=None)
+def _reportlab():
+    """(tamanho da folha A4 paisagem, módulo canvas do reportlab, cm)"""
+    with medir("carregar_reportlab"):
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.lib.units import cm
+        from reportlab.pdfgen import canvas as pdf_canvas
+    return landscape(A4), pdf_canvas, cm
+
+
+def carregar_bibliotecas():
+    """Carrega ezdxf e reportlab agora (ex.: para aquecer um worker); ms gastos em cada uma"""
+    tempos = {}
+    for nome, carregar in (("ezdxf", _ezdxf), ("reportlab", _reportlab)):
+        inicio = time.perf_counter()
+        carregar()
+        tempos[nome] = (time.perf_counter() - inicio) * 1000.0
+    return tempos
+
+
+def bibliotecas_carregadas():
+    """Quais bibliotecas de exportação este processo já carregou"""
+    return {"ezdxf": _ezdxf.cache_info().currsize > 0, "reportlab": _reportlab.cache_info().currsize > 0}
+
+
+# ========================
+# DXF com Paredes Duplas (CORRIGIDO COM TextIOWrapper)
+# ========================
+def faces_parede_dupla(p1, p2, thickness):
+    """As duas linhas (faces) de uma parede de espessura `thickness` centrada em p1-p2"""
+    off = float(thickness) / 2.0
+    x1, y1 = p1
+    x2, y2 = p2
+
+    if math.isclose(y1, y2, abs_tol=1e-9):
+        return [((x1, y1 + off), (x2, y2 + off)), ((x1, y1 - off), (x2, y2 - off))]
+
+    if math.isclose(x1, x2, abs_tol=1e-9):
+        return [((x1 + off, y1), (x2 + off, y2)), ((x1 - off, y1), (x2 - off, y2))]
+
+    return [((x1, y1), (x2, y2))]
+
+
+def contorno_margem(larg_m, comp_m, margem_m):
+    return [(-margem_m, -margem_m), (larg_m + margem_m, -margem_m),
+            (larg_m + margem_m, comp_m + margem_m), (-margem_m, comp_m + margem_m), (-margem_m, -margem_m)]
+
+
+def _adicionar_texto(layout, nome, cx, cy):
+    txt = layout.add_text(nome, dxfattribs={"layer": "TEXTOS", "height": 0.30})
+    _, _, TEA = _ezdxf()
+    if TEA is not None:
+        txt.set_placement((cx, cy), align=TEA.MIDDLE_CENTER)
+    else:
+        try:
+            txt.set_pos((cx, cy), align="MIDDLE_CENTER")
+        except Exception:
+            txt.dxf.insert = (cx, cy)
+
+
+def _nome_bloco(nome, largura, comprimento, usados):
+    """Nome de BLOCK legível e válido no DXF, ex.: "Escritorio_3x4"; repetidos ganham sufixo"""
+    ascii_ = unicodedata.normalize("NFKD", nome).encode("ascii", "ignore").decode()
+    base = re.sub(r"[^A-Za-z0-9_-]+", "_", ascii_).strip("_") or "Bloco"
+    base = f"{base}_{largura:g}x{comprimento:g}".replace(".", ",")
+    candidato, n = base, 1
+    while candidato in usados:
+        n += 1
+        candidato = f"{base}_{n}"
+    usados.add(candidato)
+    return candidato
+
+
+def _arestas(x, y, w, h):
+    """As quatro arestas de um cômodo, com as coordenadas arredondadas de extrair_paredes"""
+    x1, y1, x2, y2 = q(x), q(y), q(x + w), q(y + h)
+    return (((x1, y1), (x2, y1)), ((x1, y2), (x2, y2)), ((x1, y1), (x1, y2)), ((x2, y1), (x2, y2)))
+
+
+def inserir_blocos_comodos(doc, msp, comodos, paredes, esp_ext_m):
+    """Um BLOCK por (tipo, largura, comprimento) repetido e um INSERT por cômodo.
+
+    O bloco tem o rótulo centralizado e o contorno do cômodo na camada
+    COMODOS (desligada). Um cômodo isolado (nenhuma aresta dividida ou fundida
+    com vizinhos) tem as quatro paredes só dele: as faces delas vão para o
+    bloco e saem do modelspace. Paredes compartilhadas continuam vindo dos
+    segmentos fundidos, que dependem dos vizinhos e não se repetem por tipo.
+    Um par que aparece uma vez só sai como TEXT simples: a definição do bloco
+    custaria mais bytes que o que ela economiza.
+
+    Retorna os segmentos de `paredes` que ficaram dentro dos blocos.
+    """
+    if "COMODOS" not in doc.layers:
+        doc.layers.new(name="COMODOS", dxfattribs={"color": 8}).off()
+    externos = {(s.p1, s.p2): s for s in paredes.segmentos if s.externa}
+    itens = []
+    for nome, x, y, w, h in geometria_comodos(comodos):
+        proprias = [externos.get(a) for a in _arestas(x, y, w, h)]
+        isolado = all(proprias)
+        itens.append((nome, x, y, w, h, proprias if isolado else None, (nome, q(w), q(h), isolado)))
+    usos = Counter(chave for *_, chave in itens)
+
+    blocos = {}
+    usados = set()
+    nos_blocos = set()
+    for nome, x, y, w, h, proprias, chave in itens:
+        if usos[chave] < 2:
+            _adicionar_texto(msp, nome, x + w / 2, y + h / 2)
+            continue
+        bloco = blocos.get(chave)
+        if bloco is None:
+            rotulo = f"{nome} paredes" if proprias else nome
+            bloco = blocos[chave] = _nome_bloco(rotulo, chave[1], chave[2], usados)
+            definicao = doc.blocks.new(name=bloco)
+            definicao.add_lwpolyline([(0, 0), (w, 0), (w, h), (0, h)], close=True, dxfattribs={"layer": "COMODOS"})
+            _adicionar_texto(definicao, nome, w / 2, h / 2)
+            if proprias:
+                for p1, p2 in _arestas(0.0, 0.0, w, h):
+                    for a, b in faces_parede_dupla(p1, p2, esp_ext_m):
+                        definicao.add_line(a, b, dxfattribs={"layer": "PAREDES"})
+        if proprias:
+            nos_blocos.update(proprias)
+            msp.add_blockref(bloco, (q(x), q(y)), dxfattribs={"layer": "PAREDES"})
+        else:
+            msp.add_blockref(bloco, (x, y), dxfattribs={"layer": "COMODOS"})
+    return nos_blocos
+
+
+def gerar_dxf_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50, paredes=None, blocos=False):
+    """Gera DXF com paredes duplas e margem
+
+    Todos os geradores aceitam `paredes` já extraídas (ver gerar_zip_pacote);
+    sem elas, extraem de `comodos`. Com `blocos`, os rótulos (e as paredes dos
+    cômodos isolados) saem como INSERTs de blocos por tipo de cômodo (ver
+    inserir_blocos_comodos).
+    """
+    ezdxf, _, _ = _ezdxf()
+    doc = ezdxf.new("R2010")
+    msp = doc.modelspace()
+
+    if "PAREDES" not in doc.layers:
+        doc.layers.new(name="PAREDES", dxfattribs={"color": 7})
+    if "TEXTOS" not in doc.layers:
+        doc.layers.new(name="TEXTOS", dxfattribs={"color": 2})
+    if "MARGEM" not in doc.layers:
+        doc.layers.new(name="MARGEM", dxfattribs={"color": 1})
+
+    if paredes is None:
+        paredes = extrair_paredes(comodos)
+
+    # Desenhar margem (retângulo externo)
+    msp.add_lwpolyline(
+        contorno_margem(larg_m, comp_m, margem_m),
+        dxfattribs={"layer": "MARGEM", "color": 1}
+    )
+
+    nos_blocos = inserir_blocos_comodos(doc, msp, comodos, paredes, esp_ext_m) if blocos else set()
+
+    for seg in paredes.segmentos:
+        if seg in nos_blocos:
+            continue
+        thickness = esp_ext_m if seg.externa else esp_int_m
+        for a, b in faces_parede_dupla(seg.p1, seg.p2, thickness):
+            msp.add_line(a, b, dxfattribs={"layer": "PAREDES"})
+
+    if not blocos:
+        for nome, cx, cy in paredes.textos:
+            _adicionar_texto(msp, nome, cx, cy)
+
+    # CORRIGIDO: usar TextIOWrapper para converter strings em bytes
+    buff_bytes = io.BytesIO()
+    buff_text = io.TextIOWrapper(buff_bytes, encoding='utf-8')
+    doc.write(buff_text)
+    buff_text.flush()
+    buff_bytes.seek(0)
+    return buff_bytes.getvalue()
+
+
+def gerar_dxf_blocos(larg_m, comp_m, comodos, **kwargs):
+    return gerar_dxf_paredes_duplas(larg_m, comp_m, comodos, blocos=True, **kwargs)
+
+
+# ========================
+# DXF em streaming (R12)
+# ========================
+def _escapar_dxf(erro):
+    """Caracteres fora do cp1252 viram \\U+XXXX (escape de texto do DXF)"""
+    trecho = erro.object[erro.start:erro.end]
+    return "".join(f"\\U+{ord(ch):04X}" for ch in trecho), erro.end
+
+
+codecs.register_error("autoplantas_dxf", _escapar_dxf)
+
+
+class _Pedacos:
+    """Destino de escrita (texto do r12writer ou bytes do zipfile) que acumula até ser drenado"""
+
+    def __init__(self):
+        self.partes = []
+        self.tamanho = 0
+
+    def write(self, texto):
+        dados = texto.encode("cp1252", errors="autoplantas_dxf") if isinstance(texto, str) else bytes(texto)
+        self.partes.append(dados)
+        self.tamanho += len(dados)
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def drenar(self):
+        dados = b"".join(self.partes)
+        self.partes.clear()
+        self.tamanho = 0
+        return dados
+
+
+def iter_dxf_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50, tamanho_pedaco=64 * 1024, paredes=None):
+    """Gera o mesmo desenho de gerar_dxf_paredes_duplas como pedaços de bytes (DXF R12).
+
+    As entidades vão direto para a saída conforme são produzidas, sem montar um
+    documento ezdxf: a memória do arquivo fica limitada a ~`tamanho_pedaco`.
+    """
+    saida = _Pedacos()
+    if paredes is None:
+        paredes = extrair_paredes(comodos)
+
+    _, r12writer, _ = _ezdxf()
+    with r12writer(saida) as dxf:
+        dxf.add_polyline(contorno_margem(larg_m, comp_m, margem_m), layer="MARGEM", color=1)
+
+        for seg in paredes.segmentos:
+            thickness = esp_ext_m if seg.externa else esp_int_m
+            for a, b in faces_parede_dupla(seg.p1, seg.p2, thickness):
+                dxf.add_line(a, b, layer="PAREDES", color=7)
+            if saida.tamanho >= tamanho_pedaco:
+                yield saida.drenar()
+
+        for nome, cx, cy in paredes.textos:
+            dxf.add_text(nome, insert=(cx, cy), height=0.30, align="MIDDLE_CENTER", layer="TEXTOS", color=2)
+            if saida.tamanho >= tamanho_pedaco:
+                yield saida.drenar()
+
+    if saida.tamanho:
+        yield saida.drenar()
+
+
+def gerar_dxf_r12(larg_m, comp_m, comodos, **kwargs):
+    """O DXF R12 de iter_dxf_paredes_duplas inteiro, para quem precisa dos bytes de uma vez"""
+    return b"".join(iter_dxf_paredes_duplas(larg_m, comp_m, comodos, **kwargs))
+
+
+# ========================
+# PDF com ReportLab
+# ========================
+ESCALAS_PDF = [50, 75, 100, 125, 200, 250, 500]
+
+
+def tracar_paredes_pdf(c, paredes, esp_ext_m, esp_int_m, escala, x0, y0):
+    """Todas as faces de parede num único path (um só comando de traço no PDF)"""
+    p = c.beginPath()
+    for seg in paredes.segmentos:
+        thickness = esp_ext_m if seg.externa else esp_int_m
+        for (ax, ay), (bx, by) in faces_parede_dupla(seg.p1, seg.p2, thickness):
+            p.moveTo(x0 + ax * escala, y0 + ay * escala)
+            p.lineTo(x0 + bx * escala, y0 + by * escala)
+    c.drawPath(p, stroke=1, fill=0)
+
+
+def gerar_pdf_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50, paredes=None):
+    """Gera PDF com planta baixa em A4 paisagem com margem"""
+    buffer = io.BytesIO()
+    folha, pdf_canvas, cm = _reportlab()
+    page_width, page_height = folha
+    c = pdf_canvas.Canvas(buffer, pagesize=folha)
+    
+    margin = 1 * cm
+    disponivel_w = page_width - 2 * margin
+    disponivel_h = page_height - 3 * cm
+    
+    # Escala para caber na página (incluindo margem)
+    escala_w = disponivel_w / (larg_m + 2 * margem_m)
+    escala_h = disponivel_h / (comp_m + 2 * margem_m)
+    escala = min(escala_w, escala_h)
+    
+    # Posição inicial (com margem)
+    total_w = (larg_m + 2 * margem_m) * escala
+    total_h = (comp_m + 2 * margem_m) * escala
+    x_inicio = margin + (disponivel_w - total_w) / 2 + margem_m * escala
+    y_inicio = margin + (disponivel_h - total_h) / 2 + margem_m * escala
+    
+    # Título
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(margin, page_height - 1 * cm, "PLANTA BAIXA")
+    
+    # Data e escala
+    c.setFont("Helvetica", 10)
+    data_str = datetime.now().strftime("%d/%m/%Y")
+    c.drawString(margin, page_height - 1.5 * cm, f"Data: {data_str}")
+    c.drawString(margin + 8 * cm, page_height - 1.5 * cm, f"Escala: 1:{int(1/escala*100)}")
+    
+    if paredes is None:
+        paredes = extrair_paredes(comodos)
+    
+    # Desenhar margem
+    c.setLineWidth(1.0)
+    margem_x1 = x_inicio - margem_m * escala
+    margem_y1 = y_inicio - margem_m * escala
+    margem_x2 = x_inicio + larg_m * escala
+    margem_y2 = y_inicio + comp_m * escala
+    c.rect(margem_x1, margem_y1, margem_x2 - margem_x1, margem_y2 - margem_y1, stroke=1, fill=0)
+    
+    # Desenhar paredes
+    c.setLineWidth(0.5)
+    tracar_paredes_pdf(c, paredes, esp_ext_m, esp_int_m, escala, x_inicio, y_inicio)
+    
+    # Desenhar textos
+    c.setFont("Helvetica", 8)
+    for nome, cx, cy in paredes.textos:
+        cx_px = x_inicio + cx * escala
+        cy_px = y_inicio + cy * escala
+        c.drawCentredString(cx_px, cy_px, nome)
+    
+    c.save()
+    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def gerar_pdf_folhas_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50, escala=100, paredes=None):
+    """Gera PDF em escala arquitetônica real (1:escala), dividido em folhas A4 paisagem.
+
+    A planta é desenhada uma única vez num Form XObject; cada folha só recorta
+    e referencia o trecho que lhe cabe, então mais folhas não repetem o desenho.
+    """
+    buffer = io.BytesIO()
+    folha, pdf_canvas, cm = _reportlab()
+    page_width, page_height = folha
+    c = pdf_canvas.Canvas(buffer, pagesize=folha)
+
+    margin = 1 * cm
+    area_w = page_width - 2 * margin
+    area_h = page_height - 3 * cm
+
+    pt_por_m = 72.0 / 0.0254 / escala  # 1 m no terreno = 1/escala m no papel
+    total_w = (larg_m + 2 * margem_m) * pt_por_m
+    total_h = (comp_m + 2 * margem_m) * pt_por_m
+    colunas = max(1, math.ceil(total_w / area_w - 1e-9))
+    linhas = max(1, math.ceil(total_h / area_h - 1e-9))
+
+    if paredes is None:
+        paredes = extrair_paredes(comodos)
+
+    # Planta inteira, uma vez só, em coordenadas do form (origem no canto da margem)
+    c.beginForm("planta", 0, 0, total_w, total_h)
+    x0 = y0 = margem_m * pt_por_m
+    c.setLineWidth(1.0)
+    c.rect(0, 0, total_w, total_h, stroke=1, fill=0)
+    c.setLineWidth(0.5)
+    tracar_paredes_pdf(c, paredes, esp_ext_m, esp_int_m, pt_por_m, x0, y0)
+    c.setFont("Helvetica", 8)
+    for nome, cx, cy in paredes.textos:
+        c.drawCentredString(x0 + cx * pt_por_m, y0 + cy * pt_por_m, nome)
+    c.endForm()
+
+    data_str = datetime.now().strftime("%d/%m/%Y")
+    n_folha = 0
+    for linha in range(linhas):  # de cima para baixo
+        for coluna in range(colunas):
+            n_folha += 1
+            c.setFont("Helvetica-Bold", 16)
+            c.drawString(margin, page_height - 1 * cm, "PLANTA BAIXA")
+            c.setFont("Helvetica", 10)
+            c.drawString(margin, page_height - 1.5 * cm, f"Data: {data_str}")
+            c.drawString(margin + 8 * cm, page_height - 1.5 * cm, f"Escala: 1:{escala}")
+            c.drawString(margin + 14 * cm, page_height - 1.5 * cm,
+                         f"Folha {n_folha}/{linhas * colunas} (linha {linha + 1}, coluna {coluna + 1})")
+
+            c.saveState()
+            recorte = c.beginPath()
+            recorte.rect(margin, margin, area_w, area_h)
+            c.clipPath(recorte, stroke=0, fill=0)
+            c.translate(margin - coluna * area_w, margin - (total_h - (linha + 1) * area_h))
+            c.doForm("planta")
+            c.restoreState()
+            c.showPage()
+
+    c.save()
+    return buffer.getvalue()
+
+
+# ========================
+# SVG/CDR com paredes duplas
+# ========================
+def _num(v, fator):
+    """Coordenada inteira (em 1/fator de unidade) formatada sem zeros à direita"""
+    if v % fator == 0:
+        return str(v // fator)
+    return f"{v / fator:.6f}".rstrip("0")
+
+
+def _caminho_svg(faces, escala, margem_m, fator):
+    """Junta várias faces de parede num único "d" de <path>, com comandos relativos.
+
+    As coordenadas são arredondadas antes de tirar as diferenças, então os
+    deslocamentos relativos não acumulam erro.
+    """
+    d = io.StringIO()
+    atual = None
+    for (x1, y1), (x2, y2) in faces:
+        ax, ay = round((x1 + margem_m) * escala * fator), round((y1 + margem_m) * escala * fator)
+        bx, by = round((x2 + margem_m) * escala * fator), round((y2 + margem_m) * escala * fator)
+        if atual is None:
+            d.write(f"M{_num(ax, fator)} {_num(ay, fator)}")
+        else:
+            d.write(f"m{_num(ax - atual[0], fator)} {_num(ay - atual[1], fator)}")
+        if by == ay:
+            d.write(f"h{_num(bx - ax, fator)}")
+        elif bx == ax:
+            d.write(f"v{_num(by - ay, fator)}")
+        else:
+            d.write(f"l{_num(bx - ax, fator)} {_num(by - ay, fator)}")
+        atual = (bx, by)
+    return d.getvalue()
+
+
+def gerar_svg_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50, precisao=2, paredes=None):
+    """Gera SVG compatível com CorelDRAW com margem.
+
+    Todas as faces de parede saem em dois <path> (externas e internas), com
+    coordenadas de `precisao` casas decimais.
+    """
+    escala = 100  # 1m = 100 unidades SVG
+    fator = 10 ** precisao
+    if paredes is None:
+        paredes = extrair_paredes(comodos)
+
+    externas = []
+    internas = []
+    for seg in paredes.segmentos:
+        if seg.externa:
+            externas.extend(faces_parede_dupla(seg.p1, seg.p2, esp_ext_m))
+        else:
+            internas.extend(faces_parede_dupla(seg.p1, seg.p2, esp_int_m))
+
+    def num(v):
+        return _num(round(v * fator), fator)
+
+    svg = io.StringIO()
+    svg.write(
+        f'<svg width="{num((larg_m + 2 * margem_m) * escala)}" height="{num((comp_m + 2 * margem_m) * escala)}" xmlns="http://www.w3.org/2000/svg">\n'
+        '<defs><style>text { font-family: Arial; font-size: 12px; }</style></defs>\n'
+    )
+
+    # Desenhar margem
+    svg.write(
+        f'<rect x="{num(margem_m * escala)}" y="{num(margem_m * escala)}" '
+        f'width="{num(larg_m * escala)}" height="{num(comp_m * escala)}" stroke="black" stroke-width="2" fill="none"/>\n'
+    )
+
+    # Desenhar paredes
+    for classe, faces in (("externas", externas), ("internas", internas)):
+        if faces:
+            svg.write(f'<path id="paredes-{classe}" d="{_caminho_svg(faces, escala, margem_m, fator)}" stroke="black" stroke-width="1" fill="none"/>\n')
+
+    # Desenhar textos
+    svg.write('<g text-anchor="middle" dominant-baseline="middle">\n')
+    for nome, cx, cy in paredes.textos:
+        svg.write(f'<text x="{num((cx + margem_m) * escala)}" y="{num((cy + margem_m) * escala)}">{escape(nome)}</text>\n')
+    svg.write('</g>\n</svg>')
+    return svg.getvalue()
+
+
+def gerar_svgz_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50, nivel=9, paredes=None):
+    """Mesmo SVG de gerar_svg_paredes_duplas, compactado com gzip (.svgz)"""
+    svg = gerar_svg_paredes_duplas(larg_m, comp_m, comodos, esp_ext_m=esp_ext_m, esp_int_m=esp_int_m, margem_m=margem_m, paredes=paredes)
+    return gzip.compress(svg.encode("utf-8"), compresslevel=nivel)
+
+
+# ========================
+# Pacote ZIP (DXF + PDF + SVG)
+# ========================
+NIVEL_ZIP = 6
+
+
+def iter_zip_pacote(larg_m, comp_m, comodos, esp_ext_m=0.20, esp_int_m=0.12, margem_m=0.50, nivel=NIVEL_ZIP, escala=None, blocos=False, r12=False, tamanho_pedaco=64 * 1024):
+    """DXF, PDF e SVG da planta num único ZIP, produzido em pedaços de bytes.
+
+    As paredes são extraídas uma vez e repassadas aos três geradores. `nivel`
+    é o nível do deflate (0 = sem compressão); com `escala`, o PDF sai em
+    folhas na escala 1:escala (ver gerar_pdf_folhas_paredes_duplas). O DXF é
+    o R2010 (com BLOCK/INSERT se `blocos`); com `r12`, vai para o ZIP em
+    streaming no formato R12.
+    """
+    paredes = extrair_paredes(comodos)
+    params = dict(esp_ext_m=esp_ext_m, esp_int_m=esp_int_m, margem_m=margem_m, paredes=paredes)
+    saida = _Pedacos()  # sem seek: o zipfile grava em modo streaming (data descriptors)
+    if nivel > 0:
+        zf = zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=nivel)
+    else:
+        zf = zipfile.ZipFile(saida, "w", compression=zipfile.ZIP_STORED)
+
+    with zf:
+        if not r12:
+            zf.writestr("planta.dxf", gerar_dxf_paredes_duplas(larg_m, comp_m, comodos, blocos=blocos, **params))
+        else:
+            with zf.open("planta.dxf", "w") as f:
+                for pedaco in iter_dxf_paredes_duplas(larg_m, comp_m, comodos, tamanho_pedaco=tamanho_pedaco, **params):
+                    f.write(pedaco)
+                    if saida.tamanho >= tamanho_pedaco:
+                        yield saida.drenar()
+
+        if escala is None:
+            zf.writestr("planta.pdf", gerar_pdf_paredes_duplas(larg_m, comp_m, comodos, **params))
+        else:
+            zf.writestr("planta.pdf", gerar_pdf_folhas_paredes_duplas(larg_m, comp_m, comodos, escala=escala, **params))
+        if saida.tamanho >= tamanho_pedaco:
+            yield saida.drenar()
+
+        zf.writestr("planta.svg", gerar_svg_paredes_duplas(larg_m, comp_m, comodos, **params))
+
+    if saida.tamanho:
+        yield saida.drenar()
+
+
+def gerar_zip_pacote(larg_m, comp_m, comodos, **kwargs):
+    return b"".join(iter_zip_pacote(larg_m, comp_m, comodos, **kwargs))
+
+
+# ========================
+# Registro de formatos
+# ========================
+GERADORES = {
+    "dxf": gerar_dxf_paredes_duplas,
+    "dxf_blocos": gerar_dxf_blocos,
+    "dxf_r12": gerar_dxf_r12,
+    "pdf": gerar_pdf_paredes_duplas,
+    "pdf_folhas": gerar_pdf_folhas_paredes_duplas,
+    "svg": gerar_svg_paredes_duplas,
+    "svgz": gerar_svgz_paredes_duplas,
+    "zip": gerar_zip_pacote,
+}
+
+# Extensão do arquivo quando difere do nome do formato
+EXTENSOES = {"pdf_folhas": "folhas.pdf", "dxf_blocos": "blocos.dxf", "dxf_r12": "r12.dxf"}
+
+# Formatos que podem ser produzidos em pedaços, sem montar o arquivo inteiro
+GERADORES_STREAM = {
+    "dxf_r12": iter_dxf_paredes_duplas,
+    "zip": iter_zip_pacote,
+}
@@ -0,0 +1,156 @@
+import hashlib
+from collections import namedtuple
+
+# ========================
+# Histórico de revisões (desfazer/refazer)
+# ========================
+TAMANHO_FATIA = 64  # blocos por fatia compartilhável entre revisões
+LIMITE_REVISOES = 200
+
+# Registro imutável de um bloco; revisões diferentes apontam para o mesmo objeto
+# enquanto o bloco não muda
+Registro = namedtuple("Registro", ["id", "nome", "x", "y", "largura", "comprimento"])
+Revisao = namedtuple("Revisao", ["id", "fatias", "resumos"])
+
+
+def _registro(c):
+    return Registro(
+        c["id"], c.get("nome", "Bloco"),
+        float(c["x"]), float(c["y"]), float(c["largura"]), float(c["comprimento"]),
+    )
+
+
+def _resumo(fatia):
+    """Digest da geometria de uma fatia (sem ids: mesma planta, mesmo resumo)"""
+    return hashlib.blake2b(repr([r[1:] for r in fatia]).encode(), digest_size=16).digest()
+
+
+class Historico:
+    """Pilha de revisões da planta com compartilhamento estrutural.
+
+    Cada revisão é uma tupla de fatias de TAMANHO_FATIA registros. Uma fatia
+    sem alterações é reaproveitada (o mesmo objeto) pela revisão seguinte, e
+    registros de blocos inalterados também: cada passo custa memória
+    proporcional ao que mudou, não à planta inteira.
+
+    O id da revisão é um hash do conteúdo, então serve de chave para caches de
+    exportação: plantas iguais têm o mesmo id, em qualquer sessão.
+    """
+
+    def __init__(self, comodos=(), limite=LIMITE_REVISOES):
+        self.limite = limite
+        self.revisoes = []
+        self.pos = -1
+        self._por_id = {}
+        self._posicoes = {}  # id -> posição do bloco na revisão atual
+        self.registrar(comodos)
+
+    @property
+    def atual(self):
+        return self.revisoes[self.pos]
+
+    def registrar(self, comodos, alterados=None):
+        """Cria uma revisão com o estado atual dos cômodos (nada muda se for igual à atual).
+
+        Com `alterados` (ids que podem ter mudado, ex.: os que o sync do canvas
+        processou), só as fatias desses blocos são refeitas: o custo acompanha a
+        edição, não a planta. Se a lista ganhou, perdeu ou reordenou blocos,
+        registra a planta inteira.
+        """
+        anterior = self.revisoes[self.pos] if self.revisoes else None
+        if alterados is not None and anterior is not None and len(comodos) == len(self._posicoes):
+            revisao = self._registrar_alterados(comodos, alterados, anterior)
+            if revisao is not None:
+                return revisao
+
+        registros = []
+        for c in comodos:
+            novo = _registro(c)
+            velho = self._por_id.get(novo.id)
+            registros.append(velho if velho == novo else novo)
+
+        fatias = []
+        resumos = []
+        for n, k in enumerate(range(0, len(registros), TAMANHO_FATIA)):
+            fatia = tuple(registros[k:k + TAMANHO_FATIA])
+            if anterior is not None and n < len(anterior.fatias):
+                velha = anterior.fatias[n]
+                if len(velha) == len(fatia) and all(a is b for a, b in zip(velha, fatia)):
+                    fatias.append(velha)
+                    resumos.append(anterior.resumos[n])
+                    continue
+            fatias.append(fatia)
+            resumos.append(_resumo(fatia))
+
+        rev_id = hashlib.blake2b(b"".join(resumos), digest_size=16).hexdigest()
+        if anterior is not None and rev_id == anterior.id and len(fatias) == len(anterior.fatias):
+            return anterior
+        self._por_id = {r.id: r for r in registros}
+        self._posicoes = {r.id: k for k, r in enumerate(registros)}
+        return self._empilhar(rev_id, fatias, resumos)
+
+    def _registrar_alterados(self, comodos, alterados, anterior):
+        """registrar() só com as fatias dos blocos `alterados`; None se a ordem dos blocos mudou"""
+        novos = {}
+        for cid in alterados:
+            k = self._posicoes.get(cid)
+            if k is None:
+                continue  # não é um bloco (ex.: o terreno do canvas)
+            if comodos[k].get("id") != cid:
+                return None
+            novo = _registro(comodos[k])
+            if novo != self._por_id[cid]:
+                novos[k] = novo
+        if not novos:
+            return anterior
+
+        trocas = {}
+        for k, novo in novos.items():
+            trocas.setdefault(k // TAMANHO_FATIA, []).append((k % TAMANHO_FATIA, novo))
+        fatias = list(anterior.fatias)
+        resumos = list(anterior.resumos)
+        for n, itens in trocas.items():
+            fatia = list(fatias[n])
+            for i, novo in itens:
+                fatia[i] = novo
+            fatias[n] = tuple(fatia)
+            resumos[n] = _resumo(fatias[n])
+
+        rev_id = hashlib.blake2b(b"".join(resumos), digest_size=16).hexdigest()
+        if rev_id == anterior.id:
+            return anterior
+        self._por_id.update((r.id, r) for r in novos.values())
+        return self._empilhar(rev_id, fatias, resumos)
+
+    def _empilhar(self, rev_id, fatias, resumos):
+        # Um novo ramo descarta o que podia ser refeito
+        del self.revisoes[self.pos + 1:]
+        self.revisoes.append(Revisao(rev_id, tuple(fatias), tuple(resumos)))
+        if len(self.revisoes) > self.limite:
+            del self.revisoes[: len(self.revisoes) - self.limite]
+        self.pos = len(self.revisoes) - 1
+        return self.revisoes[self.pos]
+
+    def pode_desfazer(self):
+        return self.pos > 0
+
+    def pode_refazer(self):
+        return self.pos < len(self.revisoes) - 1
+
+    def _ir_para(self, pos):
+        self.pos = pos
+        registros = [r for fatia in self.atual.fatias for r in fatia]
+        self._por_id = {r.id: r for r in registros}
+        self._posicoes = {r.id: k for k, r in enumerate(registros)}
+        return self.comodos()
+
+    def desfazer(self):
+        """Volta uma revisão; retorna os cômodos dela (ou None se não houver)"""
+        return self._ir_para(self.pos - 1) if self.pode_desfazer() else None
+
+    def refazer(self):
+        return self._ir_para(self.pos + 1) if self.pode_refazer() else None
+
+    def comodos(self):
+        """Cômodos (dicts novos, editáveis) da revisão atual"""
+        return [r._asdict() for fatia in self.atual.fatias for r in fatia]
@@ -0,0 +1,361 @@
+import io
+import math
+import re
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from functools import lru_cache
+
+from metricas import medir
+from paredes import q
+from persistencia import CAMPOS_META, PADROES
+
+# ========================
+# Importação de DXF (leitura em streaming)
+# ========================
+# O arquivo é lido tag a tag com o leitor de baixo nível do ezdxf (o mesmo do
+# addon iterdxf), sem montar um documento: a memória fica nas entidades que
+# interessam (linhas, polilinhas, textos e INSERTs), nunca no arquivo inteiro.
+Importacao = namedtuple("Importacao", ["comodos", "meta", "avisos"])
+Insercao = namedtuple("Insercao", ["bloco", "x", "y", "escala_x", "escala_y", "rotacao"])
+TOL = 1e-3
+ESPESSURA_MAX_M = 0.6  # faces paralelas mais próximas que isso viram uma parede só
+_ESCAPE = re.compile(r"\\U\+([0-9A-Fa-f]{4})")
+
+
+@lru_cache(maxsize=None)
+def _leitor():
+    """(ascii_tags_loader, tag_compiler, toencoding, DXFStructureError) do ezdxf"""
+    with medir("carregar_leitor_dxf"):
+        from ezdxf.lldxf.const import DXFStructureError
+        from ezdxf.lldxf.tagger import ascii_tags_loader, tag_compiler
+        from ezdxf.tools.codepage import toencoding
+    return ascii_tags_loader, tag_compiler, toencoding, DXFStructureError
+
+
+def _codificacao(binario):
+    """Codificação do texto do DXF, pelo HEADER (sem HEADER, como no nosso R12: cp1252)"""
+    ascii_tags_loader, _, toencoding, _ = _leitor()
+    texto = io.TextIOWrapper(binario, encoding="cp1252", errors="ignore")
+    versao, pagina = "AC1009", "ANSI_1252"
+    try:
+        variavel = None
+        for n, tag in enumerate(ascii_tags_loader(texto)):
+            if tag.code == 0 and tag.value in ("ENDSEC", "EOF"):
+                break
+            if n == 1 and (tag.code != 2 or tag.value != "HEADER"):
+                break  # a primeira seção não é o HEADER
+            if tag.code == 9:
+                variavel = tag.value
+            elif variavel == "$ACADVER" and tag.code == 1:
+                versao = tag.value
+            elif variavel == "$DWGCODEPAGE" and tag.code == 3:
+                pagina = tag.value
+    finally:
+        texto.detach()  # o arquivo binário continua aberto para a leitura de verdade
+        binario.seek(0)
+    # A partir do AutoCAD 2007 (AC1021) o DXF é sempre UTF-8
+    return "utf-8" if versao >= "AC1021" else toencoding(pagina)
+
+
+def _texto(valor):
+    return _ESCAPE.sub(lambda m: chr(int(m.group(1), 16)), valor)
+
+
+def _retangulo(pontos):
+    """(x, y, largura, comprimento) se os pontos formam um retângulo alinhado aos eixos"""
+    if len(pontos) > 4 and math.dist(pontos[0], pontos[-1]) <= TOL:
+        pontos = pontos[:-1]
+    if len(pontos) != 4:
+        return None
+    xs = sorted({q(x, 3) for x, _ in pontos})
+    ys = sorted({q(y, 3) for _, y in pontos})
+    if len(xs) != 2 or len(ys) != 2:
+        return None
+    # Cada lado tem que ser paralelo a um eixo (descarta o "laço" em Z com os mesmos cantos)
+    for (x1, y1), (x2, y2) in zip(pontos, pontos[1:] + pontos[:1]):
+        if abs(x1 - x2) > TOL and abs(y1 - y2) > TOL:
+            return None
+    return xs[0], ys[0], xs[1] - xs[0], ys[1] - ys[0]
+
+
+class _Desenho:
+    """Entidades lidas de um espaço (modelspace ou definição de bloco)"""
+
+    def __init__(self, base=(0.0, 0.0)):
+        self.base = base
+        self.linhas = []
+        self.retangulos = []
+        self.textos = []
+        self.insercoes = []
+        self.margem = None
+
+    def adicionar(self, tipo, ent, pontos):
+        camada = ent.get(8, "0")
+        if tipo == "LINE" and pontos and 11 in ent:
+            if camada != "MARGEM":
+                self.linhas.append((pontos[0][:2], ent[11][:2]))
+        elif tipo in ("LWPOLYLINE", "POLYLINE"):
+            fechada = ent.get(70, 0) & 1 or (len(pontos) > 2 and math.dist(pontos[0], pontos[-1]) <= TOL)
+            if not fechada:
+                return
+            if camada == "MARGEM":
+                xs = [p[0] for p in pontos]
+                ys = [p[1] for p in pontos]
+                self.margem = (min(xs), min(ys), max(xs), max(ys))
+                return
+            ret = _retangulo(pontos)
+            if ret is not None:
+                self.retangulos.append(ret)
+        elif tipo == "TEXT" and 1 in ent:
+            # Alinhado (72/73 diferentes de 0): a posição que vale é o ponto 11
+            alinhado = (ent.get(72, 0) or ent.get(73, 0)) and 11 in ent
+            ponto = ent[11] if alinhado else (pontos[0] if pontos else None)
+            if ponto is not None:
+                self.textos.append((_texto(ent[1]).strip(), ponto[0], ponto[1]))
+        elif tipo == "INSERT" and 2 in ent and pontos:
+            self.insercoes.append(Insercao(
+                ent[2], pontos[0][0], pontos[0][1],
+                ent.get(41, 1.0), ent.get(42, 1.0), ent.get(50, 0.0),
+            ))
+
+
+def _ler(linhas_texto):
+    """(modelspace, {nome: bloco}) numa passada pelas tags"""
+    ascii_tags_loader, tag_compiler, _, _ = _leitor()
+    modelo = _Desenho()
+    blocos = {}
+    secao = None
+    destino = None  # _Desenho que recebe as entidades da seção/bloco atual
+    tipo, ent, pontos = None, {}, []
+    polilinha = None  # POLYLINE do R12: os vértices vêm em VERTEX até o SEQEND
+
+    for tag in tag_compiler(ascii_tags_loader(linhas_texto)):
+        code, valor = tag.code, tag.value
+        if code != 0:
+            if code == 10:
+                pontos.append(valor[:2])
+            elif tipo == "SECTION" and code == 2:
+                secao = valor
+                destino = modelo if secao == "ENTITIES" else None
+            else:
+                ent[code] = valor
+            continue
+
+        # Fim da entidade anterior
+        if tipo == "BLOCK":
+            nome = ent.get(2, "")
+            base = pontos[0] if pontos else (0.0, 0.0)
+            # *Model_Space/*Paper_Space e blocos anônimos (cotas, hachuras) não são cômodos
+            destino = None if nome.startswith("*") else blocos.setdefault(nome, _Desenho(base))
+        elif tipo == "ENDBLK":
+            destino = None
+        elif tipo == "VERTEX":
+            if polilinha is not None:
+                polilinha[2].extend(pontos)
+        elif tipo == "SEQEND":
+            if polilinha is not None and polilinha[3] is not None:
+                polilinha[3].adicionar("POLYLINE", polilinha[1], polilinha[2])
+            polilinha = None
+        elif tipo == "POLYLINE":
+            polilinha = [tipo, ent, [], destino if ent.get(67, 0) != 1 else None]
+        elif destino is not None and ent.get(67, 0) != 1:  # 67 = 1: entidade do paperspace
+            destino.adicionar(tipo, ent, pontos)
+
+        if valor == "ENDSEC":
+            secao, destino = None, None
+        tipo, ent, pontos = valor, {}, []
+    return modelo, blocos
+
+
+def _comodos_de_insercoes(insercoes, blocos, avisos):
+    comodos = []
+    for ins in insercoes:
+        bloco = blocos.get(ins.bloco)
+        if bloco is None or not bloco.retangulos:
+            avisos.append(f"Bloco '{ins.bloco}' sem contorno de cômodo: INSERT ignorado.")
+            continue
+        quartos = ins.rotacao / 90.0
+        if abs(quartos - round(quartos)) > 1e-6:
+            avisos.append(f"INSERT de '{ins.bloco}' girado {ins.rotacao:g}°: só múltiplos de 90° viram cômodos.")
+            continue
+        cos, sen = [(1, 0), (0, 1), (-1, 0), (0, -1)][round(quartos) % 4]
+        bx, by, bw, bh = bloco.retangulos[0]
+        bx0, by0 = bloco.base[0], bloco.base[1]
+        xs, ys = [], []
+        for px, py in ((bx, by), (bx + bw, by + bh)):
+            dx, dy = (px - bx0) * ins.escala_x, (py - by0) * ins.escala_y
+            xs.append(ins.x + dx * cos - dy * sen)
+            ys.append(ins.y + dx * sen + dy * cos)
+        nome = bloco.textos[0][0] if bloco.textos else ins.bloco
+        comodos.append(_comodo(nome, min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys)))
+    return comodos
+
+
+def _comodo(nome, x, y, w, h):
+    return {"nome": nome or "Bloco", "x": q(x), "y": q(y), "largura": q(w), "comprimento": q(h)}
+
+
+def _comodos_de_retangulos(retangulos, textos):
+    """Polilinhas fechadas retangulares; o nome é o do texto dentro delas (que deixa de ser rótulo livre)"""
+    livres = sorted(range(len(textos)), key=lambda i: textos[i][1])
+    cxs = [textos[i][1] for i in livres]
+    usados = set()
+    comodos = []
+    for x, y, w, h in retangulos:
+        nome = None
+        for k in range(bisect_left(cxs, x - TOL), bisect_right(cxs, x + w + TOL)):
+            i = livres[k]
+            if i not in usados and y - TOL <= textos[i][2] <= y + h + TOL:
+                usados.add(i)
+                nome = textos[i][0]
+                break
+        comodos.append(_comodo(nome, x, y, w, h))
+    return comodos, [t for i, t in enumerate(textos) if i not in usados]
+
+
+class _Eixos:
+    """Linhas de centro paralelas indexadas pela coordenada fixa (y das horizontais, x das verticais)"""
+
+    def __init__(self, linhas):
+        self.coords = sorted(linhas)
+        self.inicios = {}
+        self.fins = {}
+        for c, intervalos in linhas.items():
+            unidos = []
+            for ini, fim in sorted(intervalos):
+                if unidos and ini <= unidos[-1][1] + TOL:
+                    unidos[-1][1] = max(unidos[-1][1], fim)
+                else:
+                    unidos.append([ini, fim])
+            self.inicios[c] = [u[0] for u in unidos]
+            self.fins[c] = [u[1] for u in unidos]
+
+    def _cruza(self, c, v):
+        i = bisect_right(self.inicios[c], v + TOL) - 1
+        return i >= 0 and self.fins[c][i] >= v - TOL
+
+    def anterior(self, c0, v):
+        """Maior coordenada abaixo de c0 cuja linha passa por v"""
+        i = bisect_left(self.coords, c0 - TOL) - 1
+        while i >= 0 and not self._cruza(self.coords[i], v):
+            i -= 1
+        return self.coords[i] if i >= 0 else None
+
+    def seguinte(self, c0, v):
+        """Menor coordenada acima de c0 cuja linha passa por v"""
+        i = bisect_right(self.coords, c0 + TOL)
+        while i < len(self.coords) and not self._cruza(self.coords[i], v):
+            i += 1
+        return self.coords[i] if i < len(self.coords) else None
+
+
+def _linhas_de_centro(linhas):
+    """(horizontais, verticais, espessuras): faces duplas viram a linha de centro da parede.
+
+    As duas faces de uma parede (ver faces_parede_dupla) têm o mesmo início e
+    fim; agrupadas por extensão e ordenadas, as vizinhas a até
+    ESPESSURA_MAX_M formam um par. Linhas sem par (desenho com paredes
+    simples) ficam como estão.
+    """
+    grupos = ({}, {})
+    for (x1, y1), (x2, y2) in linhas:
+        if abs(y1 - y2) <= TOL:
+            grupos[0].setdefault((q(min(x1, x2)), q(max(x1, x2))), []).append(q(y1))
+        elif abs(x1 - x2) <= TOL:
+            grupos[1].setdefault((q(min(y1, y2)), q(max(y1, y2))), []).append(q(x1))
+
+    eixos = ({}, {})
+    espessuras = set()
+    for destino, grupo in zip(eixos, grupos):
+        for extensao, coords in grupo.items():
+            coords.sort()
+            i = 0
+            while i < len(coords):
+                a = coords[i]
+                j = i + 1
+                while j < len(coords) and coords[j] - a <= TOL:  # linhas repetidas
+                    j += 1
+                if j < len(coords) and coords[j] - a <= ESPESSURA_MAX_M:
+                    b = coords[j]
+                    espessuras.add(q(b - a, 3))
+                    destino.setdefault(q((a + b) / 2), []).append(extensao)
+                    i = j + 1
+                    while i < len(coords) and coords[i] - b <= TOL:
+                        i += 1
+                else:
+                    destino.setdefault(a, []).append(extensao)
+                    i = j
+    return _Eixos(eixos[0]), _Eixos(eixos[1]), espessuras
+
+
+def _comodos_de_rotulos(textos, horizontais, verticais, avisos):
+    """Cada rótulo fica no centro do seu cômodo: as paredes mais próximas em volta dão o retângulo"""
+    comodos = []
+    for nome, cx, cy in textos:
+        esq, dir_ = verticais.anterior(cx, cy), verticais.seguinte(cx, cy)
+        baixo, cima = horizontais.anterior(cy, cx), horizontais.seguinte(cy, cx)
+        if None in (esq, dir_, baixo, cima):
+            avisos.append(f"'{nome}' em ({cx:.2f}, {cy:.2f}) não está cercado por paredes: rótulo ignorado.")
+            continue
+        if abs((cx - esq) - (dir_ - cx)) > 10 * TOL or abs((cy - baixo) - (cima - cy)) > 10 * TOL:
+            avisos.append(f"'{nome}' em ({cx:.2f}, {cy:.2f}) não está no centro das paredes em volta: rótulo ignorado.")
+            continue
+        comodos.append(_comodo(nome, esq, baixo, dir_ - esq, cima - baixo))
+    return comodos
+
+
+def _meta(modelo, comodos, espessuras):
+    meta = dict(PADROES)
+    if espessuras:
+        meta["esp_ext_m"] = max(espessuras)
+        if len(espessuras) > 1:
+            meta["esp_int_m"] = min(espessuras)
+    if modelo.margem is not None:
+        # Contorno da margem: (-m, -m) a (W + m, H + m), ver contorno_margem
+        x0, y0, x1, y1 = modelo.margem
+        margem = max(0.0, -x0)
+        meta.update(margem_m=q(margem), terreno_w_m=q(x1 - margem), terreno_h_m=q(y1 - margem))
+    elif comodos:
+        meta["terreno_w_m"] = q(max(c["x"] + c["largura"] for c in comodos) + meta["esp_ext_m"] / 2)
+        meta["terreno_h_m"] = q(max(c["y"] + c["comprimento"] for c in comodos) + meta["esp_ext_m"] / 2)
+    return {k: float(meta[k]) for k in CAMPOS_META}
+
+
+def importar_dxf(arquivo):
+    """Reconstrói os cômodos de um DXF: Importacao(comodos, meta, avisos).
+
+    `arquivo` é um caminho ou um arquivo binário com seek (ex.: upload). Os
+    cômodos saem, nesta ordem, de INSERTs de blocos com contorno (DXF com
+    blocos), de polilinhas fechadas retangulares e dos rótulos (TEXT) cercados
+    por paredes, que é como gerar_dxf_paredes_duplas e iter_dxf_paredes_duplas
+    desenham: as faces duplas viram linhas de centro e, em volta de cada
+    rótulo, a parede mais próxima de cada lado dá o retângulo. Terreno e margem
+    vêm do contorno na camada MARGEM; as espessuras, da distância entre faces.
+    """
+    if isinstance(arquivo, (str, bytes)) or hasattr(arquivo, "__fspath__"):
+        with open(arquivo, "rb") as f:
+            return importar_dxf(f)
+
+    _, _, _, DXFStructureError = _leitor()
+    with medir("importar_dxf"):
+        if arquivo.read(18) == b"AutoCAD Binary DXF":
+            raise ValueError("DXF binário não é suportado; salve como DXF ASCII")
+        arquivo.seek(0)
+        try:
+            texto = io.TextIOWrapper(arquivo, encoding=_codificacao(arquivo), errors="replace")
+            try:
+                modelo, blocos = _ler(texto)
+            finally:
+                texto.detach()
+        except DXFStructureError as e:
+            raise ValueError(f"DXF inválido: {e}") from e
+
+        avisos = []
+        horizontais, verticais, espessuras = _linhas_de_centro(modelo.linhas)
+        comodos = _comodos_de_insercoes(modelo.insercoes, blocos, avisos)
+        de_retangulos, rotulos = _comodos_de_retangulos(modelo.retangulos, modelo.textos)
+        comodos += de_retangulos
+        comodos += _comodos_de_rotulos(rotulos, horizontais, verticais, avisos)
+        if not comodos:
+            avisos.append("Nenhum cômodo encontrado no DXF.")
+        return Importacao(comodos, _meta(modelo, comodos, espessuras), avisos)
@@ -0,0 +1,99 @@
+import math
+
+# ========================
+# Índice espacial (grade uniforme) dos blocos
+# ========================
+EPS = 1e-6
+
+
+def _intersectam(a, b):
+    """Retângulos (x, y, w, h) com área em comum (encostar não conta)"""
+    return (
+        min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]) > EPS
+        and min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]) > EPS
+    )
+
+
+class GradeEspacial:
+    """Grade uniforme: cada bloco é registrado nas células que o retângulo toca.
+
+    Atualizar um bloco custa O(células do bloco); consultas só olham as células
+    da janela pedida, sem varrer a planta inteira. Os pares sobrepostos também
+    são mantidos incrementalmente: mover um bloco só reavalia os seus vizinhos.
+    """
+
+    def __init__(self, celula_m=5.0):
+        self.celula_m = float(celula_m)
+        self.celulas = {}
+        self.retangulos = {}
+        self.sobrepostos = {}
+
+    def _faixa(self, x, y, w, h):
+        c = self.celula_m
+        i1, i2 = math.floor(x / c), math.floor((x + w) / c)
+        j1, j2 = math.floor(y / c), math.floor((y + h) / c)
+        return [(i, j) for i in range(i1, i2 + 1) for j in range(j1, j2 + 1)]
+
+    def reconstruir(self, comodos):
+        self.celulas.clear()
+        self.retangulos.clear()
+        self.sobrepostos.clear()
+        for c in comodos:
+            self.atualizar(c["id"], c["x"], c["y"], c["largura"], c["comprimento"])
+
+    def remover(self, cid):
+        ret = self.retangulos.pop(cid, None)
+        if ret is None:
+            return
+        for vid in self.sobrepostos.pop(cid, ()):
+            self.sobrepostos[vid].discard(cid)
+        for cel in self._faixa(*ret):
+            ids = self.celulas.get(cel)
+            if ids is not None:
+                ids.discard(cid)
+                if not ids:
+                    del self.celulas[cel]
+
+    def atualizar(self, cid, x, y, w, h):
+        ret = (float(x), float(y), float(w), float(h))
+        if self.retangulos.get(cid) == ret:
+            return
+        self.remover(cid)
+        vizinhos = {vid for vid in self.consultar(*ret) if _intersectam(ret, self.retangulos[vid])}
+        self.sobrepostos[cid] = vizinhos
+        for vid in vizinhos:
+            self.sobrepostos[vid].add(cid)
+        self.retangulos[cid] = ret
+        for cel in self._faixa(*ret):
+            self.celulas.setdefault(cel, set()).add(cid)
+
+    def consultar(self, x, y, w, h):
+        """Ids dos blocos cujo retângulo toca a janela (x, y, w, h)"""
+        janela = (x - EPS, y - EPS, w + 2 * EPS, h + 2 * EPS)
+        achados = set()
+        for cel in self._faixa(*janela):
+            achados.update(self.celulas.get(cel, ()))
+        return {cid for cid in achados if _intersectam(self.retangulos[cid], janela)}
+
+    def sobreposicoes(self):
+        """Pares (id_a, id_b) de blocos que se sobrepõem"""
+        pares = set()
+        for a, vizinhos in self.sobrepostos.items():
+            for b in vizinhos:
+                pares.add((a, b) if str(a) < str(b) else (b, a))
+        return sorted(pares, key=lambda p: (str(p[0]), str(p[1])))
+
+    def encaixar(self, cid, x, y, w, h, tol_m):
+        """Aproxima (x, y) das bordas dos vizinhos que estiverem a até tol_m"""
+        melhor_dx = melhor_dy = None
+        for vid in self.consultar(x - tol_m, y - tol_m, w + 2 * tol_m, h + 2 * tol_m):
+            if vid == cid:
+                continue
+            vx, vy, vw, vh = self.retangulos[vid]
+            for dx in (vx + vw - x, vx - (x + w), vx - x, (vx + vw) - (x + w)):
+                if abs(dx) <= tol_m and (melhor_dx is None or abs(dx) < abs(melhor_dx)):
+                    melhor_dx = dx
+            for dy in (vy + vh - y, vy - (y + h), vy - y, (vy + vh) - (y + h)):
+                if abs(dy) <= tol_m and (melhor_dy is None or abs(dy) < abs(melhor_dy)):
+                    melhor_dy = dy
+        return x + (melhor_dx or 0.0), y + (melhor_dy or 0.0)
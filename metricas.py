@@ -0,0 +1,128 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ========================
+# Instrumentação dos pontos quentes (tempos por etapa)
+# ========================
+LIMITES_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class Histograma:
+    """Contagens por faixa de duração (ms), no estilo dos histogramas do Prometheus"""
+
+    __slots__ = ("contagens", "total", "soma_ms", "max_ms")
+
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES_MS) + 1)  # a última faixa é +Inf
+        self.total = 0
+        self.soma_ms = 0.0
+        self.max_ms = 0.0
+
+    def observar(self, ms):
+        self.contagens[bisect.bisect_left(LIMITES_MS, ms)] += 1
+        self.total += 1
+        self.soma_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantil(self, q):
+        """Estimativa pelo limite superior da faixa onde o quantil cai"""
+        if not self.total:
+            return 0.0
+        alvo = q * self.total
+        acumulado = 0
+        for limite, n in zip(LIMITES_MS + [math.inf], self.contagens):
+            acumulado += n
+            if acumulado >= alvo:
+                return min(limite, self.max_ms)
+        return self.max_ms
+
+    def resumo(self):
+        return {
+            "n": self.total,
+            "media_ms": self.soma_ms / self.total if self.total else 0.0,
+            "p50_ms": self.quantil(0.50),
+            "p95_ms": self.quantil(0.95),
+            "max_ms": self.max_ms,
+        }
+
+
+class Metricas:
+    """Histogramas por etapa; seguro para as várias sessões (threads) do servidor"""
+
+    def __init__(self):
+        self.etapas = {}
+        self._trava = threading.Lock()
+
+    def observar(self, etapa, ms):
+        with self._trava:
+            hist = self.etapas.get(etapa)
+            if hist is None:
+                hist = self.etapas[etapa] = Histograma()
+            hist.observar(ms)
+
+    def resumo(self):
+        with self._trava:
+            return {etapa: h.resumo() for etapa, h in sorted(self.etapas.items())}
+
+    def para_json(self):
+        with self._trava:
+            return json.dumps({
+                etapa: {
+                    "limites_ms": LIMITES_MS,
+                    "contagens": h.contagens,
+                    "soma_ms": h.soma_ms,
+                    "max_ms": h.max_ms,
+                }
+                for etapa, h in sorted(self.etapas.items())
+            }, indent=2)
+
+    def para_prometheus(self, prefixo="autoplantas"):
+        """Formato de texto do Prometheus (histograma em segundos, com rótulo "etapa")"""
+        nome = f"{prefixo}_etapa_segundos"
+        linhas = [f"# HELP {nome} Duração das etapas do editor.", f"# TYPE {nome} histogram"]
+        with self._trava:
+            for etapa, h in sorted(self.etapas.items()):
+                acumulado = 0
+                for limite, n in zip(LIMITES_MS + [math.inf], h.contagens):
+                    acumulado += n
+                    le = "+Inf" if limite == math.inf else f"{limite / 1000:g}"
+                    linhas.append(f'{nome}_bucket{{etapa="{etapa}",le="{le}"}} {acumulado}')
+                linhas.append(f'{nome}_sum{{etapa="{etapa}"}} {h.soma_ms / 1000:.6f}')
+                linhas.append(f'{nome}_count{{etapa="{etapa}"}} {h.total}')
+        return "\n".join(linhas) + "\n"
+
+    def salvar(self, diretorio, base="metricas"):
+        """Grava <base>.json e <base>.prom em `diretorio`; retorna os caminhos"""
+        os.makedirs(diretorio, exist_ok=True)
+        caminhos = []
+        for ext, conteudo in (("json", self.para_json()), ("prom", self.para_prometheus())):
+            caminho = os.path.join(diretorio, f"{base}.{ext}")
+            tmp = f"{caminho}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(conteudo)
+            os.replace(tmp, caminho)
+            caminhos.append(caminho)
+        return caminhos
+
+
+# Um por processo: soma os tempos de todas as sessões
+METRICAS = Metricas()
+
+
+@contextmanager
+def medir(etapa, *extras):
+    """Cronometra o bloco e registra a duração no processo e em cada registro de `extras`"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000.0
+        METRICAS.observar(etapa, ms)
+        for registro in extras:
+            registro.observar(etapa, ms)
+
@@ -0,0 +1,88 @@
+from collections import namedtuple
+from functools import lru_cache
+
+# ========================
+# Geometria de paredes (compartilhada por DXF, PDF e SVG)
+# ========================
+Segmento = namedtuple("Segmento", ["p1", "p2", "externa"])
+Texto = namedtuple("Texto", ["nome", "cx", "cy"])
+Paredes = namedtuple("Paredes", ["segmentos", "textos"])
+
+
+def q(v, nd=4):
+    return round(float(v), nd)
+
+
+def geometria_comodos(comodos):
+    """Tupla imutável (nome, x, y, largura, comprimento) — identifica a revisão da planta"""
+    if hasattr(comodos, "geometria"):  # planta.Planta
+        return comodos.geometria()
+    return tuple(
+        (c.get("nome", "Bloco"), float(c["x"]), float(c["y"]), float(c["largura"]), float(c["comprimento"]))
+        for c in comodos
+    )
+
+
+def _varrer(intervalos):
+    """Varredura sobre intervalos colineares: divide nas fronteiras de sobreposição.
+
+    Cada sub-intervalo coberto por um único bloco é externo; coberto por dois ou
+    mais, é interno. Sub-intervalos contíguos com a mesma classificação são
+    fundidos, então a saída é mínima. Retorna [(ini, fim, externa)].
+    """
+    eventos = []
+    for ini, fim in intervalos:
+        if fim > ini:
+            eventos.append((ini, 1))
+            eventos.append((fim, -1))
+    eventos.sort()
+
+    trechos = []
+    cobertura = 0
+    anterior = None
+    for coord, delta in eventos:
+        if cobertura > 0 and coord > anterior:
+            externa = cobertura == 1
+            if trechos and trechos[-1][2] == externa and trechos[-1][1] == anterior:
+                trechos[-1][1] = coord
+            else:
+                trechos.append([anterior, coord, externa])
+        cobertura += delta
+        anterior = coord
+    return trechos
+
+
+@lru_cache(maxsize=32)
+def _extrair(geometria):
+    # Arestas agrupadas pela reta que as contém: y fixo (horizontais) ou x fixo (verticais)
+    horizontais = {}
+    verticais = {}
+    textos = []
+
+    for nome, x, y, w, h in geometria:
+        x1, y1, x2, y2 = q(x), q(y), q(x + w), q(y + h)
+        horizontais.setdefault(y1, []).append((x1, x2))
+        horizontais.setdefault(y2, []).append((x1, x2))
+        verticais.setdefault(x1, []).append((y1, y2))
+        verticais.setdefault(x2, []).append((y1, y2))
+
+        textos.append(Texto(nome, x + w / 2, y + h / 2))
+
+    segmentos = []
+    for y in sorted(horizontais):
+        for ini, fim, externa in _varrer(horizontais[y]):
+            segmentos.append(Segmento((ini, y), (fim, y), externa))
+    for x in sorted(verticais):
+        for ini, fim, externa in _varrer(verticais[x]):
+            segmentos.append(Segmento((x, ini), (x, fim), externa))
+
+    return Paredes(tuple(segmentos), tuple(textos))
+
+
+def extrair_paredes(comodos):
+    """Segmentos de parede (com classificação externa/interna) e textos dos blocos.
+
+    O resultado é memoizado pela geometria: exportar a mesma planta em vários
+    formatos calcula as paredes uma única vez.
+    """
+    return _extrair(geometria_comodos(comodos))
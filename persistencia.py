@@ -0,0 +1,140 @@
+import json
+import mmap
+import os
+import struct
+from functools import lru_cache
+
+import numpy as np
+
+from planta import Planta
+
+# ========================
+# Arquivo binário de planta (.aplt)
+# ========================
+# Layout (little-endian):
+#   cabeçalho  CABECALHO (72 bytes)
+#   registros  n_blocos × REGISTRO (40 bytes, alinhados em 8)
+#   nomes      tabela de nomes dos tipos, em UTF-8 separados por "\0"
+#   ids        ids dos blocos na ordem dos registros, idem
+MAGICO = b"APLT"
+VERSAO = 1
+EXTENSAO = ".aplt"
+CABECALHO = struct.Struct("<4sHHIIQQ5d")
+REGISTRO = np.dtype([
+    ("x", "<f8"), ("y", "<f8"), ("largura", "<f8"), ("comprimento", "<f8"),
+    ("nome", "<i4"), ("_reservado", "<i4"),
+])
+PADROES = {"terreno_w_m": 15.0, "terreno_h_m": 30.0, "esp_ext_m": 0.20, "esp_int_m": 0.12, "margem_m": 0.50}
+CAMPOS_META = ("terreno_w_m", "terreno_h_m", "esp_ext_m", "esp_int_m", "margem_m")
+
+
+def _tabela(textos):
+    if any("\0" in t for t in textos):
+        raise ValueError("nomes e ids não podem conter o caractere NUL")
+    return "\0".join(textos).encode("utf-8")
+
+
+def planta_para_bytes(comodos, **meta):
+    """Serializa cômodos (dicts ou Planta) e os parâmetros da planta (ver PADROES)"""
+    planta = comodos if isinstance(comodos, Planta) else Planta.from_comodos(comodos)
+    meta = {**PADROES, **meta}
+    registros = np.zeros(len(planta), dtype=REGISTRO)
+    registros["x"] = planta.x
+    registros["y"] = planta.y
+    registros["largura"] = planta.largura
+    registros["comprimento"] = planta.comprimento
+    registros["nome"] = planta.nome_idx
+    nomes = _tabela(planta.nomes)
+    ids = _tabela([str(i) for i in planta.ids])
+    cabecalho = CABECALHO.pack(
+        MAGICO, VERSAO, 0, len(planta), len(planta.nomes), len(nomes), len(ids),
+        *(float(meta[k]) for k in CAMPOS_META),
+    )
+    return b"".join([cabecalho, registros.tobytes(), nomes, ids])
+
+
+def planta_de_buffer(buffer):
+    """(Planta, meta) lidos de bytes/mmap; a geometria é uma visão do buffer, sem cópia"""
+    if len(buffer) < CABECALHO.size:
+        raise ValueError("arquivo de planta truncado")
+    magico, versao, _, n, n_nomes, bytes_nomes, bytes_ids, *valores = CABECALHO.unpack_from(buffer, 0)
+    if magico != MAGICO:
+        raise ValueError("não é um arquivo de planta (.aplt)")
+    if versao != VERSAO:
+        raise ValueError(f"versão de arquivo de planta não suportada: {versao}")
+    ini_nomes = CABECALHO.size + n * REGISTRO.itemsize
+    ini_ids = ini_nomes + bytes_nomes
+    if len(buffer) < ini_ids + bytes_ids:
+        raise ValueError("arquivo de planta truncado")
+
+    registros = np.frombuffer(buffer, dtype=REGISTRO, count=n, offset=CABECALHO.size)
+    nomes = bytes(buffer[ini_nomes:ini_ids]).decode("utf-8").split("\0") if n_nomes else []
+    ids = bytes(buffer[ini_ids:ini_ids + bytes_ids]).decode("utf-8").split("\0") if n else []
+    if len(nomes) != n_nomes or len(ids) != n:
+        raise ValueError("arquivo de planta corrompido: tabelas de nomes/ids não batem com o cabeçalho")
+    if n and (registros["nome"].min() < 0 or registros["nome"].max() >= n_nomes):
+        raise ValueError("arquivo de planta corrompido: índice de nome fora da tabela")
+    planta = Planta(
+        ids, nomes, registros["nome"],
+        registros["x"], registros["y"], registros["largura"], registros["comprimento"],
+    )
+    return planta, dict(zip(CAMPOS_META, valores))
+
+
+def salvar_planta(caminho, comodos, **meta):
+    """Grava o .aplt de forma atômica (arquivo temporário + rename)"""
+    tmp = f"{caminho}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(planta_para_bytes(comodos, **meta))
+    os.replace(tmp, caminho)
+
+
+@lru_cache(maxsize=16)
+def _abrir(caminho, _versao_arquivo):
+    with open(caminho, "rb") as f:
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # Os arrays da Planta mantêm o mmap vivo enquanto forem usados
+    return planta_de_buffer(mapa)
+
+
+def abrir_planta(caminho):
+    """(Planta, meta) com a geometria mapeada do arquivo (mmap somente leitura).
+
+    Aberturas repetidas do mesmo arquivo (inalterado) devolvem a mesma Planta,
+    então sessões que olham a mesma planta dividem as mesmas páginas. A Planta
+    é só de leitura: para editar, converta com to_comodos().
+    """
+    caminho = os.path.abspath(caminho)
+    info = os.stat(caminho)
+    return _abrir(caminho, (info.st_mtime_ns, info.st_size))
+
+
+# ========================
+# JSON (intercâmbio)
+# ========================
+def planta_para_json(comodos, **meta):
+    """Mesmo formato aceito pelo cli.py: parâmetros da planta + lista de cômodos"""
+    if isinstance(comodos, Planta):
+        comodos = comodos.to_comodos()
+    return json.dumps({**PADROES, **meta, "comodos": comodos}, ensure_ascii=False, indent=2)
+
+
+def planta_de_json(texto):
+    """(cômodos, meta) de um JSON de planta; parâmetros ausentes assumem PADROES"""
+    dados = json.loads(texto)
+    if not isinstance(dados, dict):
+        raise ValueError("esperado um objeto JSON com a planta")
+    lista = dados.get("comodos", [])
+    if not isinstance(lista, list) or not all(isinstance(c, dict) for c in lista):
+        raise ValueError("'comodos' deve ser uma lista de objetos JSON")
+    meta = {k: float(dados.get(k, PADROES[k])) for k in CAMPOS_META}
+    comodos = [
+        {
+            **({"id": c["id"]} if "id" in c else {}),
+            "nome": c.get("nome", "Bloco"),
+            "x": float(c["x"]), "y": float(c["y"]),
+            "largura": float(c["largura"]), "comprimento": float(c["comprimento"]),
+        }
+        for c in lista
+    ]
+    return comodos, meta
@@ -0,0 +1,123 @@
+import numpy as np
+
+# ========================
+# Planta em colunas (geometria em arrays)
+# ========================
+NOME_PADRAO = "Bloco"
+
+
+class Planta:
+    """Planta armazenada por colunas: um array float64 por campo de geometria.
+
+    Os nomes são internados numa tabela (`nomes`) e cada bloco guarda só o
+    índice do seu nome, já que as plantas repetem poucos tipos de cômodo.
+    """
+
+    __slots__ = ("ids", "nomes", "nome_idx", "x", "y", "largura", "comprimento")
+
+    def __init__(self, ids, nomes, nome_idx, x, y, largura, comprimento):
+        self.ids = list(ids)
+        self.nomes = list(nomes)
+        self.nome_idx = np.asarray(nome_idx, dtype=np.int32)
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.largura = np.asarray(largura, dtype=np.float64)
+        self.comprimento = np.asarray(comprimento, dtype=np.float64)
+
+    @classmethod
+    def from_comodos(cls, comodos):
+        tabela = {}
+        nome_idx = []
+        for c in comodos:
+            nome = c.get("nome", NOME_PADRAO)
+            nome_idx.append(tabela.setdefault(nome, len(tabela)))
+        n = len(comodos)
+        return cls(
+            [c.get("id") for c in comodos],
+            list(tabela),
+            nome_idx,
+            np.fromiter((c["x"] for c in comodos), dtype=np.float64, count=n),
+            np.fromiter((c["y"] for c in comodos), dtype=np.float64, count=n),
+            np.fromiter((c["largura"] for c in comodos), dtype=np.float64, count=n),
+            np.fromiter((c["comprimento"] for c in comodos), dtype=np.float64, count=n),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nome(self, i):
+        return self.nomes[self.nome_idx[i]]
+
+    def to_comodos(self):
+        nomes = [self.nomes[k] for k in self.nome_idx.tolist()]
+        return [
+            {"id": cid, "nome": nome, "x": x, "y": y, "largura": w, "comprimento": h}
+            for cid, nome, x, y, w, h in zip(
+                self.ids, nomes, self.x.tolist(), self.y.tolist(),
+                self.largura.tolist(), self.comprimento.tolist(),
+            )
+        ]
+
+    def selecionar(self, mascara):
+        """Nova planta só com os blocos onde `mascara` (array bool) é verdadeira"""
+        idx = np.flatnonzero(mascara)
+        return Planta(
+            [self.ids[i] for i in idx.tolist()], self.nomes, self.nome_idx[idx],
+            self.x[idx], self.y[idx], self.largura[idx], self.comprimento[idx],
+        )
+
+    def na_janela(self, x0, y0, x1, y1):
+        """Máscara dos blocos que tocam a janela [x0, x1] × [y0, y1] (em metros)"""
+        return (
+            (self.x <= x1) & (self.x + self.largura >= x0)
+            & (self.y <= y1) & (self.y + self.comprimento >= y0)
+        )
+
+    def geometria(self):
+        """Mesma tupla de paredes.geometria_comodos, sem passar por dicts"""
+        nomes = [self.nomes[k] for k in self.nome_idx.tolist()]
+        return tuple(zip(
+            nomes, self.x.tolist(), self.y.tolist(),
+            self.largura.tolist(), self.comprimento.tolist(),
+        ))
+
+
+# ========================
+# Transformações em lote (metros <-> pixels, snap, clamp)
+# ========================
+def metros_para_pixels(x, y, largura, comprimento, terreno_h_m, px_por_m):
+    """(left, top, width, height) em pixels do canvas; y do canvas cresce para baixo"""
+    left = x * px_por_m
+    top = (terreno_h_m - (y + comprimento)) * px_por_m
+    return left, top, largura * px_por_m, comprimento * px_por_m
+
+
+def pixels_para_metros(left_px, top_px, w_px, h_px, terreno_w_m, terreno_h_m, px_por_m, snap_m):
+    """Versão vetorizada do ajuste feito por sync_comodos_from_canvas.
+
+    Aplica snap e mantém os blocos dentro do terreno; devolve (x, y, largura,
+    comprimento) em metros.
+    """
+    left_px = np.asarray(left_px, dtype=np.float64)
+    top_px = np.asarray(top_px, dtype=np.float64)
+    w_px = np.asarray(w_px, dtype=np.float64)
+    h_px = np.asarray(h_px, dtype=np.float64)
+
+    snap_px = float(snap_m * px_por_m) if snap_m and snap_m > 0 else 0.0
+    if snap_px > 0:
+        left_px = np.round(left_px / snap_px) * snap_px
+        top_px = np.round(top_px / snap_px) * snap_px
+        w_px = np.maximum(1.0, np.round(w_px / snap_px) * snap_px)
+        h_px = np.maximum(1.0, np.round(h_px / snap_px) * snap_px)
+
+    terreno_w_px = float(terreno_w_m * px_por_m)
+    terreno_h_px = float(terreno_h_m * px_por_m)
+    left_px = np.clip(left_px, 0.0, np.maximum(0.0, terreno_w_px - w_px))
+    top_px = np.clip(top_px, 0.0, np.maximum(0.0, terreno_h_px - h_px))
+
+    w_m = w_px / px_por_m
+    h_m = h_px / px_por_m
+    x_m = np.clip(left_px / px_por_m, 0.0, np.maximum(0.0, terreno_w_m - w_m))
+    y_m = np.clip(terreno_h_m - (top_px / px_por_m) - h_m, 0.0, np.maximum(0.0, terreno_h_m - h_m))
+
+    return x_m, y_m, np.maximum(0.10, w_m), np.maximum(0.10, h_m)
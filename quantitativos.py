@@ -0,0 +1,88 @@
+import csv
+import io
+
+import numpy as np
+
+from paredes import extrair_paredes
+from planta import Planta
+
+# ========================
+# Quantitativos (paredes, áreas e contagens)
+# ========================
+PE_DIREITO_M = 3.0
+
+
+def segmentos_em_arrays(paredes):
+    """(comprimentos, externa) dos segmentos de parede, como arrays"""
+    n = len(paredes.segmentos)
+    coords = np.fromiter(
+        (v for s in paredes.segmentos for v in (*s.p1, *s.p2)), dtype=np.float64, count=4 * n
+    ).reshape(n, 4)
+    externa = np.fromiter((s.externa for s in paredes.segmentos), dtype=bool, count=n)
+    comprimentos = np.hypot(coords[:, 2] - coords[:, 0], coords[:, 3] - coords[:, 1])
+    return comprimentos, externa
+
+
+def calcular_quantitativos(comodos, esp_ext_m=0.20, esp_int_m=0.12, pe_direito_m=PE_DIREITO_M):
+    """Levantamento da planta, com a mesma classificação externa/interna dos exportadores.
+
+    Paredes: comprimento pela linha de centro, área de uma face (× pé-direito)
+    e volume (× espessura). Cômodos: quantidade e área por tipo.
+    """
+    planta = comodos if isinstance(comodos, Planta) else Planta.from_comodos(comodos)
+    comprimentos, externa = segmentos_em_arrays(extrair_paredes(planta))
+
+    paredes = []
+    for tipo, mascara, espessura in (("externa", externa, esp_ext_m), ("interna", ~externa, esp_int_m)):
+        total = float(comprimentos[mascara].sum())
+        paredes.append({
+            "tipo": tipo,
+            "espessura_m": float(espessura),
+            "segmentos": int(mascara.sum()),
+            "comprimento_m": total,
+            "area_m2": total * pe_direito_m,
+            "volume_m3": total * pe_direito_m * espessura,
+        })
+
+    areas = planta.largura * planta.comprimento
+    n_tipos = len(planta.nomes)
+    quantidade = np.bincount(planta.nome_idx, minlength=n_tipos)
+    area_tipo = np.bincount(planta.nome_idx, weights=areas, minlength=n_tipos)
+    tipos = [
+        {"nome": nome, "quantidade": int(q), "area_m2": float(a)}
+        for nome, q, a in zip(planta.nomes, quantidade.tolist(), area_tipo.tolist())
+    ]
+    tipos.sort(key=lambda t: t["nome"])
+
+    return {
+        "paredes": paredes,
+        "comodos": tipos,
+        "totais": {
+            "blocos": len(planta),
+            "area_m2": float(areas.sum()),
+            "comprimento_paredes_m": float(comprimentos.sum()),
+            "volume_paredes_m3": sum(p["volume_m3"] for p in paredes),
+            "pe_direito_m": float(pe_direito_m),
+        },
+    }
+
+
+def quantitativos_csv(quant):
+    """CSV com uma linha por item: seção, item, quantidade, unidade"""
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+    escritor.writerow(["secao", "item", "quantidade", "unidade"])
+    for p in quant["paredes"]:
+        item = f"parede {p['tipo']} ({p['espessura_m']:.2f} m)"
+        escritor.writerow(["paredes", item, f"{p['comprimento_m']:.2f}", "m"])
+        escritor.writerow(["paredes", item, f"{p['area_m2']:.2f}", "m2"])
+        escritor.writerow(["paredes", item, f"{p['volume_m3']:.3f}", "m3"])
+    for t in quant["comodos"]:
+        escritor.writerow(["comodos", t["nome"], t["quantidade"], "un"])
+        escritor.writerow(["comodos", t["nome"], f"{t['area_m2']:.2f}", "m2"])
+    totais = quant["totais"]
+    escritor.writerow(["totais", "blocos", totais["blocos"], "un"])
+    escritor.writerow(["totais", "area", f"{totais['area_m2']:.2f}", "m2"])
+    escritor.writerow(["totais", "paredes", f"{totais['comprimento_paredes_m']:.2f}", "m"])
+    escritor.writerow(["totais", "paredes", f"{totais['volume_paredes_m3']:.3f}", "m3"])
+    return saida.getvalue()
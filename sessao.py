@@ -0,0 +1,171 @@
+import itertools
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# ========================
+# Memória por sessão e cache compartilhado de derivados
+# ========================
+CACHE_MAX_BYTES = 256 * 1024 * 1024  # teto do processo para drawings e outros derivados
+CACHE_TTL_S = 30 * 60  # derivado sem uso há mais tempo que isso é descartado
+ORCAMENTO_SESSAO_BYTES = 8 * 1024 * 1024  # o que cada sessão pode manter no próprio session_state
+
+
+def tamanho_bytes(obj, _vistos=None):
+    """Estimativa (recursiva) do tamanho em memória de dicts/listas/strings/números"""
+    if _vistos is None:
+        _vistos = set()
+    if id(obj) in _vistos:
+        return 0
+    _vistos.add(id(obj))
+    total = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            total += tamanho_bytes(k, _vistos) + tamanho_bytes(v, _vistos)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            total += tamanho_bytes(v, _vistos)
+    return total
+
+
+def tamanho_estimado(obj, amostra=64):
+    """Como tamanho_bytes, mas dicts e listas grandes são medidos por uma amostra dos itens.
+
+    O custo não depende do tamanho do objeto: serve para checagens feitas a cada evento.
+    """
+    n = len(obj) if isinstance(obj, (dict, list, tuple)) else 0
+    if n <= amostra:
+        return tamanho_bytes(obj)
+    if isinstance(obj, dict):
+        parte = sum(tamanho_bytes(k) + tamanho_bytes(v) for k, v in itertools.islice(obj.items(), amostra))
+    else:
+        parte = sum(tamanho_bytes(v) for v in itertools.islice(obj, amostra))
+    return sys.getsizeof(obj) + parte * n // amostra
+
+
+class CacheLRU:
+    """Cache LRU limitado em bytes, com validade (TTL) contada a partir do último acesso.
+
+    A ordem do OrderedDict é a de acesso, então os itens vencidos ficam sempre
+    no início e a limpeza não precisa varrer o cache inteiro.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl_s=CACHE_TTL_S):
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.itens = OrderedDict()
+        self.bytes = 0
+        self.despejos = 0
+        self._trava = threading.Lock()
+
+    def _tirar(self, chave):
+        _, tamanho, _ = self.itens.pop(chave)
+        self.bytes -= tamanho
+
+    def _limpar(self, agora):
+        while self.itens:
+            chave, (_, tamanho, acesso) = next(iter(self.itens.items()))
+            if self.bytes <= self.max_bytes and agora - acesso <= self.ttl_s:
+                break
+            self._tirar(chave)
+            self.despejos += 1
+
+    def get(self, chave, padrao=None):
+        agora = time.monotonic()
+        with self._trava:
+            item = self.itens.get(chave)
+            if item is None:
+                return padrao
+            valor, tamanho, acesso = item
+            if agora - acesso > self.ttl_s:
+                self._tirar(chave)
+                self.despejos += 1
+                return padrao
+            self.itens[chave] = (valor, tamanho, agora)
+            self.itens.move_to_end(chave)
+            return valor
+
+    def put(self, chave, valor, tamanho=None):
+        if tamanho is None:
+            tamanho = tamanho_bytes(valor)
+        agora = time.monotonic()
+        with self._trava:
+            if chave in self.itens:
+                self._tirar(chave)
+            self.itens[chave] = (valor, tamanho, agora)
+            self.bytes += tamanho
+            self._limpar(agora)
+
+    def remover(self, chave):
+        with self._trava:
+            if chave in self.itens:
+                self._tirar(chave)
+
+    def tamanho_de(self, chave):
+        item = self.itens.get(chave)
+        return 0 if item is None else item[1]
+
+    def estatisticas(self):
+        return {"itens": len(self.itens), "bytes": self.bytes, "max_bytes": self.max_bytes, "despejos": self.despejos}
+
+
+# Um por processo: todas as sessões do servidor dividem o mesmo teto
+CACHE_DERIVADOS = CacheLRU()
+
+
+class MemoriaSessao:
+    """Controla o que uma sessão mantém em memória.
+
+    Derivados grandes (como o drawing do canvas) não ficam no session_state:
+    vão para o cache compartilhado sob uma chave da sessão e são reconstruídos
+    a partir dos cômodos se tiverem sido despejados. Os itens recalculáveis que
+    ficam no session_state são medidos contra ORCAMENTO_SESSAO_BYTES.
+    """
+
+    def __init__(self, sessao_id, state, cache=CACHE_DERIVADOS, orcamento=ORCAMENTO_SESSAO_BYTES):
+        self.sessao_id = sessao_id
+        self.state = state
+        self.cache = cache
+        self.orcamento = orcamento
+
+    def _chave(self, nome):
+        return f"{self.sessao_id}:{nome}"
+
+    def espiar(self, nome):
+        """Derivado em cache, ou None se não existir (sem reconstruir)"""
+        return self.cache.get(self._chave(nome))
+
+    def obter(self, nome, construir):
+        valor = self.espiar(nome)
+        if valor is None:
+            valor = construir()
+            self.guardar(nome, valor)
+        return valor
+
+    def guardar(self, nome, valor):
+        self.cache.put(self._chave(nome), valor)
+
+    def descartar(self, nome):
+        self.cache.remover(self._chave(nome))
+
+    def aplicar_orcamento(self, descartaveis):
+        """Se os itens de `descartaveis` (nome -> valor vazio) passaram do orçamento, zera-os.
+
+        Só entram aqui itens que a aplicação sabe recalcular, como as impressões
+        do canvas. Os cômodos não contam: são a própria planta, não há o que
+        descartar. A medida é estimada (tamanho_estimado), então checar a cada
+        evento do canvas não custa proporcional à planta.
+        """
+        uso = sum(tamanho_estimado(self.state[n]) for n in descartaveis if n in self.state)
+        if uso <= self.orcamento:
+            return False
+        for nome, vazio in descartaveis.items():
+            self.state[nome] = vazio
+        return True
+
+    def relatorio(self, nomes_estado=("comodos", "canvas_fps"), nomes_cache=("drawing",)):
+        """Bytes usados pela sessão: no session_state e no cache compartilhado (medida exata, O(planta))"""
+        estado = {n: tamanho_bytes(self.state[n]) for n in nomes_estado if n in self.state}
+        cache = {n: self.cache.tamanho_de(self._chave(n)) for n in nomes_cache}
+        return {"estado": estado, "cache": cache, "sessao": sum(estado.values())}
@@ -0,0 +1,187 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+
+from armazem import ARMAZEM
+from exportadores import GERADORES, GERADORES_STREAM, carregar_bibliotecas
+from metricas import METRICAS
+from sessao import CACHE_DERIVADOS
+
+# ========================
+# Exportação em segundo plano
+# ========================
+PROCESSOS_EXPORTACAO = int(os.environ.get("AUTOPLANTAS_PROCESSOS_EXPORTACAO", min(4, os.cpu_count() or 1)))
+# Entra na chave dos arquivos: suba sempre que a saída de algum gerador mudar,
+# senão o armazém em disco continua servindo os arquivos da versão anterior.
+VERSAO_GERADORES = 3
+
+
+def gerar_arquivo(formato, larg_m, comp_m, comodos, params):
+    """Roda no processo worker: (bytes do arquivo, ms gastos na geração)"""
+    inicio = time.perf_counter()
+    if formato in GERADORES_STREAM:
+        dados = b"".join(GERADORES_STREAM[formato](larg_m, comp_m, comodos, **params))
+    else:
+        dados = GERADORES[formato](larg_m, comp_m, comodos, **params)
+    if isinstance(dados, str):
+        dados = dados.encode("utf-8")
+    return dados, (time.perf_counter() - inicio) * 1000.0
+
+
+@contextmanager
+def _sem_main_do_app():
+    """Esconde o __main__ do processo enquanto o pool cria workers.
+
+    Com "spawn", cada worker novo reexecuta o __main__ do pai a partir do
+    __file__ dele. No servidor, o Streamlit põe ali o módulo do app.py: sem
+    isto, todo worker importaria o Streamlit e rodaria a página inteira (sem
+    sessão) antes de exportar qualquer coisa. O que os workers executam
+    (gerar_arquivo, carregar_bibliotecas) vem de módulos importáveis por nome.
+    """
+    principal = sys.modules.get("__main__")
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = principal
+
+
+class Exportacoes:
+    """Fila de exportações que roda fora da thread do script do Streamlit.
+
+    Cada arquivo é identificado por uma chave (planta + formato + opções).
+    Pedidos repetidos da mesma chave reaproveitam o job em andamento ou, se
+    já terminou, o resultado guardado no cache compartilhado (com teto em
+    bytes e validade) ou no armazém em disco, que as outras réplicas do host
+    também enxergam. Os workers são processos criados com "spawn": não
+    herdam as threads do servidor e ficam aquecidos entre exportações.
+    """
+
+    def __init__(self, processos=PROCESSOS_EXPORTACAO, cache=CACHE_DERIVADOS, armazem=ARMAZEM):
+        self.processos = max(1, processos)
+        self.cache = cache
+        self.armazem = armazem
+        self.em_andamento = {}
+        self.falhas = {}
+        self.interessados = {}  # item -> {id: Metricas} das sessões que esperam por ele
+        self._pool = None
+        self._trava = threading.Lock()
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.processos, mp_context=multiprocessing.get_context("spawn")
+            )
+            # Já na primeira exportação os workers carregam ezdxf/reportlab e ficam aquecidos
+            for _ in range(self.processos):
+                self._pool.submit(carregar_bibliotecas).add_done_callback(self._registrar_carga)
+        return self._pool
+
+    def _enviar(self, *args):
+        """submit no pool (criado se preciso); o pool cria um worker sempre que não há um ocioso"""
+        with _sem_main_do_app():
+            return self._executor().submit(*args)
+
+    @staticmethod
+    def _registrar_carga(fut):
+        if fut.cancelled() or fut.exception() is not None:
+            return
+        for nome, ms in fut.result().items():
+            if ms >= 1.0:  # menos que isso: o worker já tinha a biblioteca carregada
+                METRICAS.observar(f"carregar_{nome}", ms)
+
+    def submeter(self, chave, formato, larg_m, comp_m, comodos, esp_ext_m, esp_int_m, margem_m, opcoes=(), repetir_falha=False, metricas=None):
+        """Enfileira o arquivo (se ainda não existir nem estiver sendo gerado); retorna a chave do item.
+
+        Um item que falhou fica com o erro até ser pedido com `repetir_falha`.
+        O tempo de geração vai para metricas.METRICAS e também para `metricas`
+        (as da sessão), inclusive quando o pedido pega carona num job em andamento.
+        """
+        item = f"exportar:v{VERSAO_GERADORES}:{chave}:{formato}:{opcoes}"
+        with self._trava:
+            if item in self.em_andamento:
+                if metricas is not None:
+                    # O app resubmete a cada rerun enquanto espera: cada sessão conta uma vez
+                    self.interessados.setdefault(item, {})[id(metricas)] = metricas
+                return item
+            if self._do_cache(item) is not None:
+                return item
+            if item in self.falhas:
+                if not repetir_falha:
+                    return item
+                del self.falhas[item]
+            params = dict(esp_ext_m=esp_ext_m, esp_int_m=esp_int_m, margem_m=margem_m, **dict(opcoes))
+            # Cópia dos cômodos: a sessão continua editando a lista enquanto o job espera na fila
+            retrato = [dict(c) for c in comodos]
+            args = (gerar_arquivo, formato, float(larg_m), float(comp_m), retrato, params)
+            try:
+                fut = self._enviar(*args)
+            except BrokenProcessPool:
+                # Um worker morreu (ex.: sem memória) e inutilizou o pool: recria e tenta de novo
+                self._pool = None
+                fut = self._enviar(*args)
+            self.em_andamento[item] = fut
+            if metricas is not None:
+                self.interessados[item] = {id(metricas): metricas}
+        fut.add_done_callback(lambda f: self._concluir(item, formato, f))
+        return item
+
+    def _concluir(self, item, formato, fut):
+        with self._trava:
+            self.em_andamento.pop(item, None)
+            interessados = self.interessados.pop(item, {}).values()
+            if fut.cancelled():
+                return
+            erro = fut.exception()
+            if erro is not None:
+                self.falhas[item] = erro
+                return
+            dados, ms = fut.result()
+            self.cache.put(item, dados, len(dados))
+        for registro in [METRICAS, *interessados]:
+            registro.observar(f"gerar_{formato}", ms)
+        if self.armazem is not None:
+            try:
+                self.armazem.put(item, dados)
+            except OSError:
+                pass  # disco cheio ou sem permissão: o arquivo continua no cache em memória
+
+    def _do_cache(self, item):
+        """Bytes do cache em memória ou, na falta, do armazém em disco (que reabastece a memória)"""
+        dados = self.cache.get(item)
+        if dados is None and self.armazem is not None:
+            dados = self.armazem.get(item)
+            if dados is not None:
+                self.cache.put(item, dados, len(dados))
+        return dados
+
+    def pronto(self, item):
+        with self._trava:
+            return item not in self.em_andamento
+
+    def progresso(self, itens):
+        """Fração dos itens já concluídos (com sucesso ou erro)"""
+        return sum(self.pronto(i) for i in itens) / len(itens) if itens else 1.0
+
+    def resultado(self, item):
+        """Bytes do arquivo; None se ainda não terminou ou se saiu do cache (basta submeter de novo).
+
+        Se a geração falhou, a exceção do worker é relançada aqui.
+        """
+        with self._trava:
+            erro = self.falhas.get(item)
+            if erro is not None:
+                raise erro
+            if item in self.em_andamento:
+                return None
+        return self._do_cache(item)
+
+
+# Uma por processo do servidor: sessões que pedem a mesma planta dividem os jobs
+EXPORTACOES = Exportacoes()
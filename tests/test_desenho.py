@@ -0,0 +1,100 @@
+from desenho import comodos_to_drawing, ids_objetos, objetos_editados, patch_drawing, sync_comodos_from_canvas
+from historico import Historico
+
+PX_POR_M = 40.0
+SNAP_M = 0.10
+
+
+def _eco_fabric(drawing):
+    """Valor que o canvas devolve ao carregar `drawing`: sem ids e com 2 casas decimais"""
+    return {"objects": [
+        {k: round(v, 2) if isinstance(v, float) else v for k, v in o.items() if k != "id"}
+        for o in drawing["objects"]
+    ]}
+
+
+class Editor:
+    """O fluxo do canvas no app.py, sem Streamlit: cada `rerun` recebe o valor atual do canvas"""
+
+    def __init__(self, comodos, terreno_w_m=12.0, terreno_h_m=8.0):
+        self.w, self.h = terreno_w_m, terreno_h_m
+        self.comodos = comodos
+        self.historico = Historico(comodos)
+        self.drawing = comodos_to_drawing(self.w, self.h, comodos, PX_POR_M)
+        self.fps = {}
+        self.aguardando = True
+
+    def rerun(self, valor):
+        objs = valor["objects"]
+        ids = ids_objetos(objs, self.drawing)
+        alterados, self.fps, self.aguardando = objetos_editados(objs, ids, self.drawing, self.fps, self.aguardando)
+        if alterados:
+            sync_comodos_from_canvas(valor, self.w, self.h, self.comodos, PX_POR_M, SNAP_M, indices=alterados, ids=ids)
+            self.historico.registrar(self.comodos, {ids[i] for i in alterados})
+        return alterados
+
+    def restaurar(self, comodos):
+        self.comodos = comodos
+        patch_drawing(self.drawing, self.h, comodos, PX_POR_M)
+        self.aguardando = True
+
+
+def _editor():
+    comodos = [
+        {"id": f"c{i}", "nome": "Sala", "x": 3.0 * i, "y": 0.0, "largura": 3.0, "comprimento": 4.0}
+        for i in range(4)
+    ]
+    return Editor(comodos)
+
+
+def test_eco_do_drawing_inicial_nao_e_edicao():
+    editor = _editor()
+    assert editor.rerun(_eco_fabric(editor.drawing)) == []
+    assert not editor.aguardando
+    assert not editor.historico.pode_desfazer()
+
+
+def test_desfazer_mantem_o_refazer_com_o_valor_velho_do_canvas():
+    editor = _editor()
+    editor.rerun(_eco_fabric(editor.drawing))
+    arrastado = _eco_fabric(editor.drawing)
+    arrastado["objects"][1]["left"] += 2.0 * PX_POR_M
+    assert editor.rerun(arrastado) == [1]
+    assert editor.historico.pode_desfazer()
+
+    editor.restaurar(editor.historico.desfazer())
+    # O Streamlit repete o valor anterior do canvas até o eco do drawing novo chegar
+    assert editor.rerun(arrastado) == []
+    assert editor.rerun(_eco_fabric(editor.drawing)) == []
+    assert editor.historico.pode_refazer()
+    assert editor.comodos[0]["x"] == 0.0
+
+    desfeito = _eco_fabric(editor.drawing)
+    editor.restaurar(editor.historico.refazer())
+    assert editor.rerun(desfeito) == []
+    assert editor.historico.pode_desfazer()
+    assert editor.comodos[0]["x"] == 2.0
+
+
+def test_edicao_antes_do_eco_ser_lido_nao_trava_a_sincronizacao():
+    editor = _editor()
+    editor.rerun(_eco_fabric(editor.drawing))
+    arrastado = _eco_fabric(editor.drawing)
+    arrastado["objects"][1]["left"] += 2.0 * PX_POR_M
+    editor.rerun(arrastado)
+
+    editor.restaurar(editor.historico.desfazer())
+    assert editor.rerun(arrastado) == []
+    # O orçamento de memória pode descartar as impressões enquanto o eco não chega
+    editor.fps = {}
+    assert editor.rerun(arrastado) == []
+    assert editor.comodos[0]["x"] == 0.0
+
+    # O eco foi substituído por um arraste feito sobre o drawing novo
+    movido = _eco_fabric(editor.drawing)
+    movido["objects"][3]["top"] -= 1.0 * PX_POR_M
+    assert editor.rerun(movido) == [3]
+    assert not editor.aguardando
+    assert editor.comodos[0]["x"] == 0.0
+    assert editor.comodos[2]["y"] == 1.0
+    assert editor.rerun(movido) == []
@@ -0,0 +1,43 @@
+from historico import TAMANHO_FATIA, Historico
+
+
+def _planta(n):
+    return [
+        {"id": f"c{i}", "nome": "Sala", "x": float(i % 50) * 3, "y": float(i // 50) * 4, "largura": 3.0, "comprimento": 4.0}
+        for i in range(n)
+    ]
+
+
+def test_registrar_alterados_equivale_a_planta_inteira():
+    comodos = _planta(5 * TAMANHO_FATIA)
+    incremental = Historico(comodos)
+    completo = Historico(comodos)
+    anterior = incremental.atual
+
+    comodos[70]["x"] += 0.5
+    comodos[200]["largura"] = 2.0
+    revisao = incremental.registrar(comodos, {"c70", "c200", "terreno"})
+    assert revisao.id == completo.registrar(comodos).id
+    # Só as fatias dos blocos alterados são novas
+    novas = [n for n, (a, b) in enumerate(zip(anterior.fatias, revisao.fatias)) if a is not b]
+    assert novas == [70 // TAMANHO_FATIA, 200 // TAMANHO_FATIA]
+
+
+def test_registrar_alterados_sem_mudanca_nao_cria_revisao():
+    comodos = _planta(10)
+    historico = Historico(comodos)
+    comodos[3]["x"] += 1.0
+    historico.registrar(comodos, {"c3"})
+    comodos = historico.desfazer()
+    historico.registrar(comodos, {"c3"})
+    assert historico.pode_refazer()
+
+
+def test_registrar_alterados_com_blocos_reordenados_registra_tudo():
+    comodos = _planta(10)
+    historico = Historico(comodos)
+    comodos.reverse()
+    comodos[0]["x"] += 1.0
+    revisao = historico.registrar(comodos, {comodos[0]["id"]})
+    assert [r.id for fatia in revisao.fatias for r in fatia] == [c["id"] for c in comodos]
+    assert historico.comodos() == comodos
@@ -0,0 +1,30 @@
+import sys
+import types
+
+from tarefas import Exportacoes
+
+
+def _modulos_do_worker():
+    """Roda no worker: módulos que denunciam o app.py e o __main__ que o spawn reexecutou"""
+    principal = sys.modules.get("__mp_main__")
+    return sorted({"streamlit", "marcador_app"} & set(sys.modules)), getattr(principal, "__file__", None)
+
+
+def test_worker_nao_reexecuta_o_app(tmp_path, monkeypatch):
+    # Como no servidor: o Streamlit troca o __main__ pelo módulo do script
+    (tmp_path / "marcador_app.py").write_text("")
+    app = tmp_path / "app_falso.py"
+    app.write_text("import marcador_app\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    principal = types.ModuleType("__main__")
+    principal.__file__ = str(app)
+    monkeypatch.setitem(sys.modules, "__main__", principal)
+
+    exportacoes = Exportacoes(processos=1, armazem=None)
+    try:
+        modulos, arquivo = exportacoes._enviar(_modulos_do_worker).result(timeout=120)
+    finally:
+        exportacoes._pool.shutdown()
+    assert modulos == []
+    assert arquivo is None
+    assert sys.modules["__main__"] is principal